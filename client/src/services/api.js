@@ -126,7 +126,7 @@ export const api = {
     return response.blob();
   },
 
-  async generateDocumentStream(prompt, type, apiConfig, onChunk) {
+  async generateDocumentStream(prompt, type, apiConfig, onChunk, onPartial) {
     const response = await fetch(`${API_HOST}/api/generate/stream`, {
       method: 'POST',
       headers: { 'Content-Type': 'application/json' },
@@ -149,13 +149,22 @@ export const api = {
     const reader = response.body.getReader();
     const decoder = new TextDecoder();
     let partialLine = '';
+    let eventType = 'message';
+
+    // "partial" events carry structure fields ({path, value}) as soon as they are generated
+    const dispatch = (data) => {
+      if (eventType === 'partial') {
+        if (onPartial) onPartial(JSON.parse(data));
+      } else if (data) {
+        onChunk(data);
+      }
+    };
 
     while (true) {
       const { done, value } = await reader.read();
       if (done) {
         if (partialLine && partialLine.startsWith('data: ')) {
-           const data = partialLine.slice(6);
-           if (data) onChunk(data);
+           dispatch(partialLine.slice(6));
         }
         break;
       }
@@ -163,9 +172,12 @@ export const api = {
       const lines = (partialLine + chunk).split('\n');
       partialLine = lines.pop();
       for (const line of lines) {
-        if (line.startsWith('data: ')) {
-          const data = line.slice(6);
-          if (data) onChunk(data);
+        if (line.startsWith('event: ')) {
+          eventType = line.slice(7).trim();
+        } else if (line.startsWith('data: ')) {
+          dispatch(line.slice(6));
+        } else if (!line.trim()) {
+          eventType = 'message';
         }
       }
     }
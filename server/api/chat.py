@@ -1,18 +1,25 @@
 from fastapi import APIRouter, HTTPException, Request
-from pydantic import BaseModel, Field
-from typing import List, Dict, Any, Optional
+from dataclasses import dataclass
+from pydantic import BaseModel, ConfigDict, Field
+from typing import Annotated, List, Dict, Any, Optional
 from core.llm import llm_service
+from core.llm_cache import llm_cache, make_key
+from core.admission import admission
 from api.models import AIConfig
-from sse_starlette.sse import EventSourceResponse
+from api.routes import SSE_HEADERS, SSE_PING_SECONDS
+from sse_starlette.sse import EventSourceResponse, ServerSentEvent
 import json
 
 router = APIRouter()
 
-class ChatMessage(BaseModel):
-    role: str = Field(..., description="'user' or 'assistant'")
+@dataclass(slots=True, frozen=True)
+class ChatMessage:
+    role: Annotated[str, Field(description="'user' or 'assistant'")]
     content: str
 
 class ChatRequest(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+
     messages: List[ChatMessage]
     api_config: Optional[AIConfig] = None
 
@@ -29,13 +36,16 @@ async def chat(request: ChatRequest):
     When ready_to_generate is True, the user can proceed to generate.
     """
     try:
-        # Convert to list of dicts for LLM
-        messages = [{"role": m.role, "content": m.content} for m in request.messages]
+        # Convert to plain dicts for LLM in a single pass
+        payload = request.model_dump(exclude_none=True)
+        messages = payload["messages"]
+        config = payload.get("api_config")
         
-        result = await llm_service.chat(
-            messages=messages,
-            config=request.api_config.dict() if request.api_config else None
-        )
+        async def compute():
+            async with admission:
+                return await llm_service.chat(messages=messages, config=config)
+        
+        result = await llm_cache.get_or_compute(make_key("chat", config, messages=messages), compute)
         
         return ChatResponse(
             message=result["message"],
@@ -53,18 +63,31 @@ async def chat_stream(request: ChatRequest, fast_request: Request):
     Streamed conversation with the AI.
     """
     try:
-        messages = [{"role": m.role, "content": m.content} for m in request.messages]
+        payload = request.model_dump(exclude_none=True)
+        messages = payload["messages"]
+        config = payload.get("api_config")
+        cache_key = make_key("chat_stream", config, messages=messages)
         
         async def event_generator():
-            async for chunk in llm_service.chat_stream(
-                messages=messages,
-                config=request.api_config.dict() if request.api_config else None
-            ):
-                if await fast_request.is_disconnected():
-                    break
-                yield {"data": chunk}
+            cached = await llm_cache.get(cache_key)
+            if cached is not None:
+                for chunk in cached:
+                    yield ServerSentEvent(data=chunk)
+                return
+            
+            chunks = []
+            async with admission:
+                async for chunk in llm_service.chat_stream(messages=messages, config=config):
+                    if await fast_request.is_disconnected():
+                        return
+                    chunks.append(chunk)
+                    yield ServerSentEvent(data=chunk)
+            
+            # Only cache complete, successful replies
+            if chunks and not chunks[-1].startswith("Error: "):
+                await llm_cache.set(cache_key, chunks)
 
-        return EventSourceResponse(event_generator())
+        return EventSourceResponse(event_generator(), headers=SSE_HEADERS, ping=SSE_PING_SECONDS)
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
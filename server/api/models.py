@@ -1,7 +1,10 @@
-from pydantic import BaseModel, Field
-from typing import Optional, List, Union, Literal, Dict, Any
+from dataclasses import dataclass, asdict
+from pydantic import BaseModel, ConfigDict, Field
+from typing import Annotated, Optional, List, Literal, Dict, Any
 
 class FontStyle(BaseModel):
+    model_config = ConfigDict(defer_build=True, extra="ignore", frozen=True)  # Rarely used; build validator on first use
+
     name: Optional[str] = Field(None, description="Font family name (e.g., 'Arial', 'Times New Roman')")
     size: Optional[float] = Field(None, description="Font size in points (pt)")
     bold: Optional[bool] = None
@@ -9,16 +12,24 @@ class FontStyle(BaseModel):
     color: Optional[str] = Field(None, description="Hex color code (e.g., '#FF0000')")
 
 class ParagraphStyle(BaseModel):
+    model_config = ConfigDict(defer_build=True, extra="ignore", frozen=True)  # Rarely used; build validator on first use
+
     alignment: Optional[str] = Field(None, description="'left', 'center', 'right', 'justify'")
     line_spacing: Optional[float] = Field(None, description="Line spacing multiplier")
     space_before: Optional[float] = Field(None, description="Spacing before paragraph in points")
     space_after: Optional[float] = Field(None, description="Spacing after paragraph in points")
 
-class AIConfig(BaseModel):
-    provider: Optional[str] = Field(None, description="AI provider (e.g., 'openai', 'anthropic')")
-    api_key: Optional[str] = Field(None, description="API key")
-    base_url: Optional[str] = Field(None, description="Base URL for the API")
-    model: Optional[str] = Field(None, description="Model name")
+@dataclass(slots=True)
+class AIConfig:
+    """Plain record validated by the enclosing request model (no per-instance BaseModel overhead)."""
+    provider: Annotated[Optional[str], Field(description="AI provider (e.g., 'openai', 'anthropic')")] = None
+    api_key: Annotated[Optional[str], Field(description="API key")] = None
+    base_url: Annotated[Optional[str], Field(description="Base URL for the API")] = None
+    model: Annotated[Optional[str], Field(description="Model name")] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Return the explicitly set options as a dict for the LLM service."""
+        return {k: v for k, v in asdict(self).items() if v is not None}
 
 class DocumentRequest(BaseModel):
     title: str = Field(default="Document", min_length=1, max_length=200)
@@ -35,13 +46,36 @@ class GenerationResponse(BaseModel):
     structure: Optional[Dict[str, Any]] = None
 
 class ModificationRequest(BaseModel):
+    model_config = ConfigDict(defer_build=True, extra="ignore")  # Rarely used; build validator on first use
+
     current_structure: Dict[str, Any]
     instruction: str
     doc_type: Literal["word", "excel", "ppt"]
     api_config: Optional[AIConfig] = Field(None, description="Custom AI configuration")
 
 class StreamGenerationRequest(BaseModel):
+    model_config = ConfigDict(defer_build=True, extra="ignore")  # Rarely used; build validator on first use
+
     prompt: str
     type: Optional[Literal["word", "excel", "ppt"]] = None
     api_config: Optional[AIConfig] = None
     context: Optional[List[Dict[str, str]]] = None # For iterative edits
+
+class ConcurrencyUpdate(BaseModel):
+    max_inflight: int = Field(..., ge=1, description="Maximum concurrent LLM calls")
+
+class BatchGenerationResponse(BaseModel):
+    batch_id: str
+    status: str
+    status_url: str
+
+class BatchItemResult(BaseModel):
+    index: int = Field(..., description="Position of the document in the submitted batch")
+    file_url: Optional[str] = None
+    structure: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+
+class BatchStatusResponse(BaseModel):
+    batch_id: str
+    status: str
+    results: Optional[List[BatchItemResult]] = Field(None, description="Generated files, once the batch has completed")
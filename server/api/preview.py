@@ -1,53 +1,118 @@
 import os
+import html
+import asyncio
+from io import BytesIO
+from pathlib import Path
 import mammoth
-import pandas as pd
-from fastapi import APIRouter, HTTPException
-from fastapi.responses import HTMLResponse
+from functools import lru_cache
+from openpyxl import load_workbook
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import HTMLResponse, Response, StreamingResponse
+from api.routes import INVALID_FILENAME
+from core.artifacts import artifact_store
 
 router = APIRouter()
 
 OUTPUT_DIR = os.path.join(os.path.dirname(__file__), '..', 'output')
+OUTPUT_REAL = Path(OUTPUT_DIR).resolve()
+
+# Max spreadsheet rows rendered in a preview
+PREVIEW_MAX_ROWS = 500
+
+XLSX_PREVIEW_HEAD = """
+            <style>
+                .table { width: 100%; border-collapse: collapse; font-family: sans-serif; font-size: 14px; color: #333; }
+                .table th { background-color: #f8f9fa; border: 1px solid #dee2e6; padding: 12px; text-align: left; font-weight: 600; }
+                .table td { border: 1px solid #dee2e6; padding: 12px; }
+                .table-striped tbody tr:nth-of-type(odd) { background-color: rgba(0,0,0,.05); }
+            </style>
+            <div style="overflow-x: auto;">
+            <table class="table table-striped table-hover">
+"""
+
+
+def _cell_html(value, tag: str) -> str:
+    return f"<{tag}>{html.escape(str(value)) if value is not None else ''}</{tag}>"
+
+
+def _xlsx_preview_rows(wb):
+    """
+    Yield the active sheet as HTML one row at a time (first row as header).
+    A plain generator: Starlette iterates it in a worker thread, keeping openpyxl off the event loop.
+    """
+    try:
+        yield XLSX_PREVIEW_HEAD
+        rows = wb.active.iter_rows(values_only=True, max_row=PREVIEW_MAX_ROWS + 1)
+        for i, row in enumerate(rows):
+            if i == 0:
+                yield "<thead><tr>" + "".join(_cell_html(v, "th") for v in row) + "</tr></thead><tbody>"
+            elif i >= PREVIEW_MAX_ROWS:
+                yield f"</tbody></table><p>仅显示前 {PREVIEW_MAX_ROWS} 行，完整内容请下载查看。</p></div>"
+                return
+            else:
+                yield "<tr>" + "".join(_cell_html(v, "td") for v in row) + "</tr>"
+        yield "</tbody></table></div>"
+    finally:
+        wb.close()
+
+@lru_cache(maxsize=128)
+def _render_docx(filepath: str, mtime_ns: int, size: int) -> str:
+    """Convert a .docx to HTML. mtime/size are part of the cache key so rewritten files re-render."""
+    with open(filepath, "rb") as docx_file:
+        return mammoth.convert_to_html(docx_file).value
+
+
+def _render_docx_bytes(data: bytes) -> str:
+    return mammoth.convert_to_html(BytesIO(data)).value
+
 
 @router.get("/preview/{filename}")
-async def preview_document(filename: str):
+async def preview_document(filename: str, request: Request):
     """Generate HTML preview for a document."""
     # Security: validate filename to prevent path traversal
-    if not filename or "/" in filename or "\\" in filename or ".." in filename:
+    if not filename or INVALID_FILENAME.search(filename):
         raise HTTPException(status_code=400, detail="Invalid filename")
     
-    filepath = os.path.join(OUTPUT_DIR, filename)
-    
-    if not os.path.exists(filepath):
-        raise HTTPException(status_code=404, detail="File not found")
+    # Files kept in memory are never rewritten, so their size is enough for the ETag
+    data = artifact_store.get(filename)
+    if data is not None:
+        etag = f'W/"mem-{len(data):x}"'
+    else:
+        # Verify the resolved path is within OUTPUT_DIR
+        target = (OUTPUT_REAL / filename).resolve()
+        if not target.is_relative_to(OUTPUT_REAL):
+            raise HTTPException(status_code=400, detail="Invalid path")
+        
+        if not target.exists():
+            raise HTTPException(status_code=404, detail="File not found")
+        filepath = str(target)
+        
+        # Unchanged files can be served from the browser cache
+        st = target.stat()
+        etag = f'W/"{st.st_mtime_ns:x}-{st.st_size:x}"'
+    cache_headers = {"ETag": etag, "Cache-Control": "private, max-age=60"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=cache_headers)
     
+    ext = os.path.splitext(filename)[1].lower()
     try:
-        if filename.lower().endswith(".docx"):
-            with open(filepath, "rb") as docx_file:
-                result = mammoth.convert_to_html(docx_file)
-                return HTMLResponse(content=result.value)
+        if ext == ".docx":
+            # mammoth is pure-Python XML work; keep it off the event loop
+            if data is not None:
+                html_content = await asyncio.to_thread(_render_docx_bytes, data)
+            else:
+                html_content = await asyncio.to_thread(_render_docx, filepath, st.st_mtime_ns, st.st_size)
+            return HTMLResponse(content=html_content, headers=cache_headers)
                 
-        elif filename.lower().endswith(".xlsx"):
-            # Read first sheet
-            df = pd.read_excel(filepath)
-            html = df.to_html(classes="table table-striped table-hover", index=False)
-            # Add some basic styling for the table
-            styled_html = f"""
-            <style>
-                .table {{ width: 100%; border-collapse: collapse; font-family: sans-serif; font-size: 14px; color: #333; }}
-                .table th {{ background-color: #f8f9fa; border: 1px solid #dee2e6; padding: 12px; text-align: left; font-weight: 600; }}
-                .table td {{ border: 1px solid #dee2e6; padding: 12px; }}
-                .table-striped tbody tr:nth-of-type(odd) {{ background-color: rgba(0,0,0,.05); }}
-            </style>
-            <div style="overflow-x: auto;">
-                {html}
-            </div>
-            """
-            return HTMLResponse(content=styled_html)
+        elif ext == ".xlsx":
+            # Stream the first sheet row by row instead of loading it into a DataFrame
+            wb = await asyncio.to_thread(load_workbook, BytesIO(data) if data is not None else filepath, read_only=True, data_only=True)
+            return StreamingResponse(_xlsx_preview_rows(wb), media_type="text/html", headers=cache_headers)
             
-        elif filename.lower().endswith(".pptx"):
+        elif ext == ".pptx":
             # For PPT, we'll just return a placeholder for now as OCR/rendering is complex
             # In a real app, you might convert to PDF or images
-            return HTMLResponse(content="<div style='padding: 20px; text-align: center; color: #666;'><h3>PowerPoint 预览暂不支持完美渲染</h3><p>建议直接下载查看。</p></div>")
+            return HTMLResponse(content="<div style='padding: 20px; text-align: center; color: #666;'><h3>PowerPoint 预览暂不支持完美渲染</h3><p>建议直接下载查看。</p></div>", headers=cache_headers)
             
         else:
             raise HTTPException(status_code=400, detail="Unsupported file type for preview")
@@ -1,172 +1,345 @@
-from fastapi import APIRouter, HTTPException, Request
-from fastapi.responses import FileResponse
-from sse_starlette.sse import EventSourceResponse
+from fastapi import APIRouter, Header, HTTPException, Request
+from fastapi.responses import FileResponse, Response
+from sse_starlette.sse import EventSourceResponse, ServerSentEvent
 from api.models import (
     DocumentRequest, 
     GenerationResponse, 
     StreamGenerationRequest, 
-    ModificationRequest
+    ModificationRequest,
+    ConcurrencyUpdate,
+    BatchGenerationResponse,
+    BatchStatusResponse
 )
 from core.llm import llm_service
-import json
-import uuid
+from core.llm_cache import llm_cache, make_key
+from core.semantic_cache import semantic_cache
+from core.admission import admission
+from core.artifacts import artifact_store, MEDIA_TYPES
+from core.batching import detect_batcher
+from core.tools import word_tool, excel_tool, ppt_tool
+from core.structure_stream import StructureStreamParser
+import secrets
+import orjson
+import asyncio
 import os
 import re
+from pathlib import Path
+from typing import Optional, List
+from cachetools import LRUCache
 
 router = APIRouter()
 
 # Ensure output directory exists
 OUTPUT_DIR = os.path.join(os.path.dirname(__file__), '..', 'output')
 os.makedirs(OUTPUT_DIR, exist_ok=True)
+OUTPUT_REAL = Path(OUTPUT_DIR).resolve()
+
+# Path separators, control characters and '..' are never valid in a requested filename
+INVALID_FILENAME = re.compile(r'[/\\\x00-\x1f]|\.\.')
+
+# Upper bound (seconds) for a buffered /generate call
+GENERATION_TIMEOUT = float(os.getenv("GENERATION_TIMEOUT", "300"))
+
+# Keep reverse proxies (nginx, Cloudflare) from buffering SSE; pings outlive LB idle timeouts
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no", "Connection": "keep-alive"}
+SSE_PING_SECONDS = 15
+
+# Document type generated speculatively while an untyped /generate request is classified ("" disables)
+SPECULATIVE_TYPE = os.getenv("SPECULATIVE_TYPE", "")
+
+_TOOLS = {"word": word_tool, "excel": excel_tool, "ppt": ppt_tool}
+
+# batch_id -> task building that batch's files; kept independently of the LLM cache TTL so the
+# returned file URLs stay stable. The bound only drops records of long-finished batches.
+_batch_results: LRUCache = LRUCache(maxsize=1024)
+_DOWNLOAD_PREFIX = "/api/download/"
+_speculation_stats = {"hits": 0, "misses": 0}
+
+async def _detect_document_type(prompt: str, config=None) -> str:
+    """Detect the document type for a prompt, reusing cached classifications."""
+    async def compute_similar():
+        # Concurrent detections are coalesced into one LLM call by the batcher
+        return await semantic_cache.get_or_compute(
+            make_key("detect", config), prompt, lambda: detect_batcher.detect(prompt, config)
+        )
+    
+    return await llm_cache.get_or_compute(make_key("detect", config, prompt=prompt), compute_similar)
+
+async def _generate(request: DocumentRequest, doc_type: str, config=None) -> dict:
+    """
+    Generate a document of the given type. Identical or similar prompts reuse the cached LLM
+    structure (see core.tools._generate_structure), but every request builds its own file.
+    """
+    tool = _TOOLS[doc_type]
+    
+    # Only the Word tool takes a style guide
+    extra = {"style_guide": request.style_guide} if doc_type == 'word' else {}
+    async with admission:
+        result = await tool.run(
+            prompt=request.content,
+            title=request.title,
+            api_config=config,
+            **extra
+        )
+    
+    if not result.success:
+         raise Exception(result.error or "Unknown error during generation")
+    
+    return GenerationResponse(
+        file_url=result.data.get("file_url"),
+        message=result.message,
+        structure=result.data.get("structure")
+    ).model_dump()
+
+def _structure_type(structure: dict) -> str:
+    """Infer the document type from the shape of a generated structure."""
+    if "slides" in structure:
+        return "ppt"
+    if "headers" in structure or "rows" in structure:
+        return "excel"
+    return "word"
 
 @router.get("/status")
 async def get_status():
     return {
         "status": "operational",
         "components": ["word", "excel", "ppt"],
-        "ai_enabled": llm_service.client is not None
+        "ai_enabled": llm_service.client is not None,
+        "speculation": {"type": SPECULATIVE_TYPE or None, **_speculation_stats}
     }
 
 @router.post("/generate", response_model=GenerationResponse)
-async def generate_document(request: DocumentRequest):
-    """Generate a document based on user request using AI."""
-    
-    # Import tools here to avoid circular dependencies if any, 
-    # though core.tools imports core.llm which is fine.
-    from core.tools import word_tool, excel_tool, ppt_tool
-    
+async def generate_document(request: DocumentRequest, fast_request: Request):
+    """
+    Generate a document based on user request using AI.
+    Clients sending Accept: text/event-stream get the structure streamed as SSE instead.
+    """
     try:
-        # Auto-detect document type if not provided
-        doc_type = request.type
-        if not doc_type:
-            doc_type = await llm_service.detect_document_type(
-                user_prompt=request.content,
-                config=request.api_config.dict() if request.api_config else None
-            )
-        
-        result = None
-        
-        # Fast-track: If structure is already provided (e.g. from stream), use it directly
+        # Fast-track: If structure is already provided (e.g. from stream), render it without any LLM call
         if request.raw_structure:
-            from core.tools import word_tool, excel_tool, ppt_tool
-            doc_id = str(uuid.uuid4())
-            if doc_type == 'word':
-                filepath = await word_tool._generate_file(doc_id, request.raw_structure, request.raw_structure.get('title', 'Generated'))
-            elif doc_type == 'excel':
-                filepath = await excel_tool._generate_file(doc_id, request.raw_structure, request.raw_structure.get('title', 'Generated'))
-            elif doc_type == 'ppt':
-                filepath = await ppt_tool._generate_file(doc_id, request.raw_structure, request.raw_structure.get('title', 'Generated'))
+            tool = _TOOLS[request.type or _structure_type(request.raw_structure)]
+            doc_id = secrets.token_hex(16)
+            filepath = await tool._generate_file(doc_id, request.raw_structure, request.title)
             
             return GenerationResponse(
-                file_url=f"/api/download/{os.path.basename(filepath)}",
+                file_url=_DOWNLOAD_PREFIX + os.path.basename(filepath),
                 message="Document generated instantly from draft structure",
                 structure=request.raw_structure
             )
-
-        if doc_type == 'word':
-            result = await word_tool.run(
-                prompt=request.content,
-                title=request.title,
-                style_guide=request.style_guide,
-                api_config=request.api_config.dict() if request.api_config else None
-            )
-        elif doc_type == 'excel':
-            result = await excel_tool.run(
-                prompt=request.content,
-                title=request.title,
-                api_config=request.api_config.dict() if request.api_config else None
-            )
-        elif doc_type == 'ppt':
-            result = await ppt_tool.run(
-                prompt=request.content,
-                title=request.title,
-                api_config=request.api_config.dict() if request.api_config else None
-            )
-        else:
+        
+        config = request.api_config.to_dict() if request.api_config else None
+        
+        streaming = "text/event-stream" in fast_request.headers.get("accept", "")
+        
+        # Auto-detect document type if not provided
+        doc_type = request.type
+        speculation = None
+        if not doc_type:
+            if SPECULATIVE_TYPE in _TOOLS and not streaming:
+                # Start generating the most likely type while the prompt is being classified
+                speculation = asyncio.create_task(_generate(request, SPECULATIVE_TYPE, config))
+                # A discarded speculation's error is irrelevant; mark it retrieved so it isn't logged
+                speculation.add_done_callback(lambda task: task.cancelled() or task.exception())
+            try:
+                doc_type = await _detect_document_type(request.content, config)
+            except BaseException:
+                if speculation is not None:
+                    speculation.cancel()
+                raise
+        
+        if doc_type not in _TOOLS:
+            if speculation is not None:
+                speculation.cancel()
             raise HTTPException(status_code=400, detail=f"Unknown document type: {doc_type}")
         
-        if not result.success:
-             raise Exception(result.error or "Unknown error during generation")
-
-        return GenerationResponse(
-            file_url=result.data.get("file_url"),
-            message=result.message,
-            structure=result.data.get("structure")
-        )
+        if streaming:
+            return _structure_stream_response(fast_request, request.content, doc_type, config)
+        
+        if speculation is None:
+            generation = _generate(request, doc_type, config)
+        elif doc_type == SPECULATIVE_TYPE:
+            _speculation_stats["hits"] += 1
+            generation = speculation
+        else:
+            _speculation_stats["misses"] += 1
+            speculation.cancel()
+            generation = _generate(request, doc_type, config)
+        
+        try:
+            result = await asyncio.wait_for(generation, timeout=GENERATION_TIMEOUT)
+        except asyncio.TimeoutError:
+            raise HTTPException(status_code=504, detail="Document generation timed out")
+        return GenerationResponse(**result)
             
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+def _structure_stream_response(
+    fast_request: Request,
+    prompt: str,
+    doc_type: str,
+    config=None,
+    context=None
+) -> EventSourceResponse:
+    """
+    SSE response streaming Markdown plus the final <STRUCTURE> block for a document.
+    Each structure scalar is also sent as a "partial" event ({"path": "sections.0.heading", "value": ...})
+    as soon as it has been generated.
+    """
+    cache_key = make_key(
+        "generate_stream",
+        config,
+        doc_type=doc_type,
+        prompt=prompt,
+        context=context
+    )
+
+    parser = StructureStreamParser()
+
+    def chunk_events(chunk: str):
+        yield ServerSentEvent(data=chunk)
+        # Structure fields become available as soon as their tokens arrive
+        for path, value in parser.feed(chunk):
+            yield ServerSentEvent(event="partial", data=orjson.dumps({"path": path, "value": value}).decode())
+
+    async def event_generator():
+        cached = await llm_cache.get(cache_key)
+        if cached is not None:
+            for chunk in cached:
+                for event in chunk_events(chunk):
+                    yield event
+            return
+        
+        chunks = []
+        async with admission:
+            async for chunk in llm_service.generate_document_structure_stream(
+                user_prompt=prompt,
+                doc_type=doc_type,
+                config=config,
+                context=context
+            ):
+                if await fast_request.is_disconnected():
+                    return
+                chunks.append(chunk)
+                for event in chunk_events(chunk):
+                    yield event
+        
+        # Only cache complete, successful streams
+        if chunks and not chunks[-1].startswith("Error: "):
+            await llm_cache.set(cache_key, chunks)
+
+    return EventSourceResponse(event_generator(), headers=SSE_HEADERS, ping=SSE_PING_SECONDS)
+
 @router.post("/generate/stream")
 async def generate_document_stream(request: StreamGenerationRequest, fast_request: Request):
-    """Stream doc content and structure."""
+    """Stream doc content and structure. Equivalent to POST /generate with Accept: text/event-stream."""
     try:
+        config = request.api_config.to_dict() if request.api_config else None
         doc_type = request.type
         if not doc_type:
-            doc_type = await llm_service.detect_document_type(
-                user_prompt=request.prompt,
-                config=request.api_config.dict() if request.api_config else None
-            )
+            doc_type = await _detect_document_type(request.prompt, config)
+        
+        return _structure_stream_response(fast_request, request.prompt, doc_type, config, request.context)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
 
-        async def event_generator():
-            async for chunk in llm_service.generate_document_structure_stream(
-                user_prompt=request.prompt,
-                doc_type=doc_type,
-                config=request.api_config.dict() if request.api_config else None,
-                context=request.context
-            ):
-                if await fast_request.is_disconnected():
-                    break
-                yield {"data": chunk}
+@router.post("/generate/batch", response_model=BatchGenerationResponse)
+async def generate_document_batch(requests: List[DocumentRequest]):
+    """
+    Queue many documents as a single provider Batch API job (cheaper, completes asynchronously).
+    Uses the server's API key and model; poll GET /generate/batch/{batch_id} for the files.
+    """
+    if not requests:
+        raise HTTPException(status_code=400, detail="Batch is empty")
+    
+    try:
+        async def resolve_type(item: DocumentRequest) -> str:
+            return item.type or await _detect_document_type(item.content)
+        
+        doc_types = await asyncio.gather(*(resolve_type(item) for item in requests))
+        items = []
+        for i, (item, doc_type) in enumerate(zip(requests, doc_types)):
+            prompt = item.content
+            if item.style_guide:
+                prompt += f"\n\nStyle guide: {item.style_guide}"
+            # The title rides in the custom_id so it survives until the batch is polled
+            items.append({"custom_id": f"{i}:{doc_type}:{item.title}", "doc_type": doc_type, "prompt": prompt})
+        
+        batch = await llm_service.submit_structure_batch(items)
+        return BatchGenerationResponse(
+            batch_id=batch.id,
+            status=batch.status,
+            status_url=f"/api/generate/batch/{batch.id}"
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
 
-        return EventSourceResponse(event_generator())
+@router.get("/generate/batch/{batch_id}", response_model=BatchStatusResponse)
+async def get_document_batch(batch_id: str):
+    """Poll a batch job; once completed, the documents are generated and their URLs returned."""
+    try:
+        batch = await llm_service.get_structure_batch(batch_id)
+        if batch.status != "completed":
+            return BatchStatusResponse(batch_id=batch.id, status=batch.status)
+        
+        # Build files only once per batch, however often it is polled; concurrent polls share the task
+        task = _batch_results.get(batch.id)
+        if task is None or (task.done() and (task.cancelled() or task.exception() is not None)):
+            task = asyncio.create_task(_generate_batch_files(batch))
+            _batch_results[batch.id] = task
+        # Shielded so a poll that disconnects doesn't cancel the build for everyone else
+        results = await asyncio.shield(task)
+        return BatchStatusResponse(batch_id=batch.id, status=batch.status, results=results)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+async def _generate_batch_files(batch) -> List[dict]:
+    """Render every structure of a completed batch into a document file."""
+    outputs = await llm_service.get_structure_batch_results(batch)
+    
+    async def build(custom_id: str, output: dict) -> dict:
+        index, doc_type, title = custom_id.split(":", 2)
+        if "error" in output:
+            return {"index": int(index), "error": output["error"]}
+        try:
+            filepath = await _TOOLS[doc_type]._generate_file(secrets.token_hex(16), output["structure"], title)
+            return {
+                "index": int(index),
+                "file_url": _DOWNLOAD_PREFIX + os.path.basename(filepath),
+                "structure": output["structure"]
+            }
+        except Exception as e:
+            return {"index": int(index), "error": str(e)}
+    
+    results = await asyncio.gather(*(build(custom_id, output) for custom_id, output in outputs.items()))
+    return sorted(results, key=lambda r: r["index"])
+
 @router.post("/modify", response_model=GenerationResponse)
 async def modify_document(request: ModificationRequest):
     """Iteratively modify an existing document structure."""
-    from core.tools import word_tool, excel_tool, ppt_tool
-    
     try:
         # 1. Update structure via LLM
         # We pass the current structure as context
         context = [
-            {"role": "assistant", "content": f"Current structure: {json.dumps(request.current_structure)}"}
+            {"role": "assistant", "content": f"Current structure: {orjson.dumps(request.current_structure).decode()}"}
         ]
         
-        new_structure = await llm_service.generate_document_structure(
-            user_prompt=request.instruction,
-            doc_type=request.doc_type,
-            config=request.api_config.dict() if request.api_config else None,
-            context=context
-        )
+        async with admission:
+            new_structure = await llm_service.generate_document_structure(
+                user_prompt=request.instruction,
+                doc_type=request.doc_type,
+                config=request.api_config.to_dict() if request.api_config else None,
+                context=context
+            )
         
         # 2. Re-generate File
-        doc_id = str(uuid.uuid4())
-        result = None
-        
-        if request.doc_type == 'word':
-            filepath = await word_tool._generate_file(doc_id, new_structure, new_structure.get('title', 'Modified'))
-            result_data = {
-                "file_url": f"/api/download/{os.path.basename(filepath)}",
-                "structure": new_structure
-            }
-        elif request.doc_type == 'excel':
-            filepath = await excel_tool._generate_file(doc_id, new_structure, new_structure.get('title', 'Modified'))
-            result_data = {
-                "file_url": f"/api/download/{os.path.basename(filepath)}",
-                "structure": new_structure
-            }
-        elif request.doc_type == 'ppt':
-            filepath = await ppt_tool._generate_file(doc_id, new_structure, new_structure.get('title', 'Modified'))
-            result_data = {
-                "file_url": f"/api/download/{os.path.basename(filepath)}",
-                "structure": new_structure
-            }
+        doc_id = secrets.token_hex(16)
+        filepath = await _TOOLS[request.doc_type]._generate_file(doc_id, new_structure, new_structure.get('title', 'Modified'))
         
         return GenerationResponse(
-            file_url=result_data["file_url"],
+            file_url=_DOWNLOAD_PREFIX + os.path.basename(filepath),
             message="Document updated successfully",
             structure=new_structure
         )
@@ -175,12 +348,21 @@ async def modify_document(request: ModificationRequest):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.post("/admin/concurrency")
+async def set_concurrency(update: ConcurrencyUpdate, authorization: Optional[str] = Header(None)):
+    """Resize the in-flight LLM call limit at runtime. Requires ADMIN_TOKEN."""
+    admin_token = os.getenv("ADMIN_TOKEN")
+    if not admin_token or authorization != f"Bearer {admin_token}":
+        raise HTTPException(status_code=403, detail="Forbidden")
+    
+    await admission.resize(update.max_inflight)
+    return {"max_inflight": admission.cmax, "in_flight": admission.active}
 
 @router.get("/download/{filename}")
 async def download_file(filename: str):
     """Download a generated file."""
     # Security: validate filename to prevent path traversal
-    if not filename or "/" in filename or "\\" in filename or ".." in filename:
+    if not filename or INVALID_FILENAME.search(filename):
         raise HTTPException(status_code=400, detail="Invalid filename")
     
     # Only allow expected file extensions
@@ -188,13 +370,20 @@ async def download_file(filename: str):
     if not filename.lower().endswith(allowed_extensions):
         raise HTTPException(status_code=400, detail="Invalid file type")
     
-    filepath = os.path.join(OUTPUT_DIR, filename)
+    data = artifact_store.get(filename)
+    if data is not None:
+        return Response(
+            content=data,
+            media_type=MEDIA_TYPES[os.path.splitext(filename)[1].lower()],
+            headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+        )
     
     # Verify the resolved path is within OUTPUT_DIR
-    if not os.path.realpath(filepath).startswith(os.path.realpath(OUTPUT_DIR)):
+    filepath = (OUTPUT_REAL / filename).resolve()
+    if not filepath.is_relative_to(OUTPUT_REAL):
         raise HTTPException(status_code=400, detail="Invalid path")
     
-    if not os.path.exists(filepath):
+    if not filepath.exists():
         raise HTTPException(status_code=404, detail="File not found")
     
     return FileResponse(filepath, filename=filename)
@@ -0,0 +1,54 @@
+import os
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class Admission:
+    """
+    Bounds the number of concurrent LLM calls.
+    Unlike asyncio.Semaphore, the limit can be changed at runtime: waiters re-check it on resize.
+    """
+
+    def __init__(self, cmax: int):
+        self.cmax = cmax
+        self.active = 0
+        self.cond = asyncio.Condition()
+
+    async def acquire(self):
+        async with self.cond:
+            try:
+                await self.cond.wait_for(lambda: self.active < self.cmax)
+            except asyncio.CancelledError:
+                # A waiter cancelled after being notified would swallow the wakeup; pass it on
+                self.cond.notify(1)
+                raise
+            self.active += 1
+
+    async def release(self):
+        # Decrement before any await, so a cancelled release cannot leak a slot
+        self.active -= 1
+        await asyncio.shield(self._wake_one())
+
+    async def _wake_one(self):
+        async with self.cond:
+            self.cond.notify(1)
+
+    async def resize(self, cmax: int):
+        """Change the limit; raising it wakes every waiter that now fits."""
+        async with self.cond:
+            self.cmax = cmax
+            self.cond.notify_all()
+        logger.info(f"Admission limit set to {cmax}")
+
+    async def __aenter__(self):
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.release()
+
+
+# Global instance
+admission = Admission(int(os.getenv("MAX_INFLIGHT", "16")))
@@ -0,0 +1,41 @@
+import os
+import threading
+from typing import Optional
+
+from cachetools import TTLCache
+
+INMEM_ARTIFACTS = os.getenv("INMEM_ARTIFACTS", "").lower() in ("1", "true", "yes")
+ARTIFACT_TTL = int(os.getenv("ARTIFACT_TTL", "600"))
+ARTIFACT_CACHE_SIZE = int(os.getenv("ARTIFACT_CACHE_SIZE", "64"))
+
+MEDIA_TYPES = {
+    ".docx": "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+    ".xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    ".pptx": "application/vnd.openxmlformats-officedocument.presentationml.presentation",
+}
+
+
+class ArtifactStore:
+    """
+    Keeps generated files in memory instead of writing them to the output directory.
+    Entries expire after ttl seconds (or when maxsize is exceeded) and are then gone for good,
+    so only enable it where files are downloaded or previewed soon after generation.
+    """
+
+    def __init__(self, enabled: bool = INMEM_ARTIFACTS, maxsize: int = ARTIFACT_CACHE_SIZE, ttl: int = ARTIFACT_TTL):
+        self.enabled = enabled
+        self._cache = TTLCache(maxsize=maxsize, ttl=max(ttl, 1))
+        # Files are saved from worker threads and read on the event loop
+        self._lock = threading.Lock()
+
+    def put(self, file_name: str, data: bytes):
+        with self._lock:
+            self._cache[file_name] = data
+
+    def get(self, file_name: str) -> Optional[bytes]:
+        with self._lock:
+            return self._cache.get(file_name)
+
+
+# Global instance
+artifact_store = ArtifactStore()
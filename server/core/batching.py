@@ -0,0 +1,87 @@
+import os
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from core.admission import admission
+from core.llm import llm_service
+
+logger = logging.getLogger(__name__)
+
+DETECT_BATCH_WINDOW = float(os.getenv("DETECT_BATCH_WINDOW_MS", "0")) / 1000
+DETECT_BATCH_SIZE = int(os.getenv("DETECT_BATCH_SIZE", "16"))
+
+
+def _group_key(config: Optional[Dict[str, Any]]) -> Tuple:
+    """Only prompts bound for the same key, endpoint and model can share a request."""
+    return tuple(sorted((k, v) for k, v in (config or {}).items() if v is not None))
+
+
+class DetectBatcher:
+    """
+    Coalesces concurrent document type detections into one LLM call.
+    Prompts arriving within the window share a request, which is sent early once max_batch are pending.
+    A window of 0 (the default) sends every prompt on its own.
+    """
+
+    def __init__(self, window: float = DETECT_BATCH_WINDOW, max_batch: int = DETECT_BATCH_SIZE):
+        self.window = window
+        self.max_batch = max_batch
+        self._pending: Dict[Tuple, List[Tuple[str, asyncio.Future]]] = {}
+        self._timers: Dict[Tuple, asyncio.TimerHandle] = {}
+        self._tasks: Set[asyncio.Task] = set()
+
+    async def detect(self, prompt: str, config: Optional[Dict[str, Any]] = None) -> str:
+        loop = asyncio.get_running_loop()
+        group = _group_key(config)
+        future = loop.create_future()
+        batch = self._pending.setdefault(group, [])
+        batch.append((prompt, future))
+
+        if self.window <= 0 or len(batch) >= self.max_batch:
+            self._flush(group, config)
+        elif len(batch) == 1:
+            self._timers[group] = loop.call_later(self.window, self._flush, group, config)
+
+        return await future
+
+    def _flush(self, group: Tuple, config: Optional[Dict[str, Any]]):
+        timer = self._timers.pop(group, None)
+        if timer is not None:
+            timer.cancel()
+        batch = self._pending.pop(group, None)
+        if batch:
+            task = asyncio.create_task(self._run(batch, config))
+            # Keep a reference so the task isn't garbage collected mid-flight
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch: List[Tuple[str, asyncio.Future]], config: Optional[Dict[str, Any]]):
+        prompts = [prompt for prompt, _ in batch]
+        try:
+            async with admission:
+                if len(prompts) == 1:
+                    results = [await llm_service.detect_document_type(user_prompt=prompts[0], config=config)]
+                else:
+                    try:
+                        results = await llm_service.detect_document_types(user_prompts=prompts, config=config)
+                    except ValueError as e:
+                        # The model returned a malformed list; classify each prompt on its own
+                        logger.warning(f"Batched detection fell back to single requests: {e}")
+                        results = await asyncio.gather(*(
+                            llm_service.detect_document_type(user_prompt=prompt, config=config)
+                            for prompt in prompts
+                        ))
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+
+# Global instance
+detect_batcher = DetectBatcher()
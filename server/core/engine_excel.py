@@ -1,20 +1,86 @@
 from openpyxl import Workbook
 from openpyxl.styles import Font, Alignment, Border, Side, PatternFill, Protection
+from openpyxl.cell import WriteOnlyCell
 from openpyxl.utils import get_column_letter
 from openpyxl.chart import BarChart, PieChart, LineChart, Reference
-from typing import Optional, List, Dict, Any, Union
+from typing import Optional, List, Dict, Any, Union, Iterable, Tuple
 from io import BytesIO
+from core.fileio import save_sequential
+
+_H_ALIGNMENTS = frozenset({'left', 'center', 'right'})
 
 
 class ExcelEngine:
     """
     A comprehensive Excel workbook generator with full formatting control.
     Supports: cell formatting, formulas, charts, conditional formatting, and more.
+    
+    With streaming=True the workbook is write-only: rows are serialized as they are
+    appended instead of being kept in memory, which suits very large sheets. Cells cannot
+    be addressed in this mode, so only set_sheet_name, add_sheet, select_sheet, set_column_width
+    (call it before appending rows), write_rows_bulk/set_data_range, add_bar_chart and save
+    are available; every other method raises RuntimeError.
     """
     
-    def __init__(self):
-        self.wb = Workbook()
-        self.ws = self.wb.active
+    def __init__(self, streaming: bool = False):
+        self.streaming = streaming
+        if streaming:
+            self.wb = Workbook(write_only=True)
+            self.ws = self.wb.create_sheet()
+        else:
+            self.wb = Workbook()
+            self.ws = self.wb.active
+        # Style objects are immutable in openpyxl, so identical styles share one instance
+        self._font_cache: Dict[tuple, Font] = {}
+        self._fill_cache: Dict[str, PatternFill] = {}
+        self._align_cache: Dict[str, Alignment] = {}
+        self._border_cache: Dict[str, Border] = {}
+        # worksheet -> last row written through this engine; ws.append continues after it
+        self._last_rows: Dict[Any, int] = {}
+    
+    # ==================== STYLE CACHE ====================
+    
+    def _font(
+        self,
+        name: Optional[str] = 'Arial',
+        size: Optional[float] = 11,
+        bold: bool = False,
+        italic: bool = False,
+        color: Optional[str] = None
+    ) -> Font:
+        key = (name, size, bold, italic, color)
+        font = self._font_cache.get(key)
+        if font is None:
+            font = self._font_cache[key] = Font(name=name, size=size, bold=bold, italic=italic, color=color)
+        return font
+    
+    def _fill(self, color: str) -> PatternFill:
+        fill = self._fill_cache.get(color)
+        if fill is None:
+            fill = self._fill_cache[color] = PatternFill(start_color=color, end_color=color, fill_type='solid')
+        return fill
+    
+    def _alignment(self, horizontal: str) -> Alignment:
+        alignment = self._align_cache.get(horizontal)
+        if alignment is None:
+            alignment = self._align_cache[horizontal] = Alignment(horizontal=horizontal)
+        return alignment
+    
+    def _border(self, style: str) -> Border:
+        border = self._border_cache.get(style)
+        if border is None:
+            side = Side(style=style)
+            border = self._border_cache[style] = Border(left=side, right=side, top=side, bottom=side)
+        return border
+    
+    def _mark_row(self, row: int):
+        """Record that the current sheet has cells up to row."""
+        if row > self._last_rows.get(self.ws, 0):
+            self._last_rows[self.ws] = row
+    
+    def _require_random_access(self, operation: str):
+        if self.streaming:
+            raise RuntimeError(f"{operation} is not supported by a streaming (write-only) ExcelEngine")
     
     # ==================== WORKSHEET OPERATIONS ====================
     
@@ -63,10 +129,12 @@ class ExcelEngine:
             alignment: 'left', 'center', 'right'
             number_format: Excel number format (e.g., '#,##0.00', '0%')
         """
+        self._require_random_access("set_cell")
         cell = self.ws.cell(row=row, column=col, value=value)
+        self._mark_row(row)
         
         # Font styling
-        cell.font = Font(
+        cell.font = self._font(
             name=font_name or 'Arial',
             size=font_size or 11,
             bold=bold,
@@ -75,14 +143,11 @@ class ExcelEngine:
         )
         
         # Alignment
-        align_map = {'left': 'left', 'center': 'center', 'right': 'right'}
-        cell.alignment = Alignment(horizontal=align_map.get(alignment, 'left'))
+        cell.alignment = self._alignment(alignment if alignment in _H_ALIGNMENTS else 'left')
         
         # Background color
         if bg_color:
-            cell.fill = PatternFill(start_color=bg_color.lstrip('#'), 
-                                    end_color=bg_color.lstrip('#'), 
-                                    fill_type='solid')
+            cell.fill = self._fill(bg_color.lstrip('#'))
         
         # Number format
         if number_format:
@@ -92,7 +157,21 @@ class ExcelEngine:
     
     def set_formula(self, row: int, col: int, formula: str):
         """Set a formula in a cell."""
+        self._require_random_access("set_formula")
         self.ws.cell(row=row, column=col, value=formula)
+        self._mark_row(row)
+        return self
+    
+    def set_formulas_bulk(self, formulas: Iterable[Tuple[int, int, str]]):
+        """Set many formulas given as (row, col, formula) in a single pass."""
+        self._require_random_access("set_formulas_bulk")
+        cell = self.ws.cell
+        last_row = 0
+        for row, col, formula in formulas:
+            cell(row=row, column=col, value=formula)
+            if row > last_row:
+                last_row = row
+        self._mark_row(last_row)
         return self
     
     def set_row_data(
@@ -103,12 +182,47 @@ class ExcelEngine:
         header: bool = False
     ):
         """Set a row of data."""
+        self._require_random_access("set_row_data")
+        header_font = self._font(name=None, size=None, bold=True) if header else None
         for i, value in enumerate(data):
             cell = self.ws.cell(row=row, column=start_col + i, value=value)
             if header:
-                cell.font = Font(bold=True)
+                cell.font = header_font
+        if data:
+            self._mark_row(row)
+        return self
+    
+    def write_rows_bulk(self, rows: Iterable[Iterable[Any]], header: bool = True):
+        """
+        Append rows after the last used row of the sheet via ws.append.
+        Much faster than per-cell writes for large data; if header is True, the first row is bolded.
+        """
+        it = iter(rows)
+        row = self._last_rows.get(self.ws, 0)
+        if header:
+            first = next(it, None)
+            if first is None:
+                return self
+            header_font = self._font(name=None, size=None, bold=True)
+            row += 1
+            if self.streaming:
+                self.ws.append([self._write_only_cell(value, header_font) for value in first])
+            else:
+                first = list(first)
+                self.ws.append(first)
+                for col in range(1, len(first) + 1):
+                    self.ws.cell(row=row, column=col).font = header_font
+        append = self.ws.append
+        for row, row_data in enumerate(it, row + 1):
+            append(row_data)
+        self._last_rows[self.ws] = row
         return self
     
+    def _write_only_cell(self, value: Any, font: Font) -> WriteOnlyCell:
+        cell = WriteOnlyCell(self.ws, value=value)
+        cell.font = font
+        return cell
+    
     def set_data_range(
         self,
         data: List[List[Any]],
@@ -117,6 +231,11 @@ class ExcelEngine:
         header: bool = True
     ):
         """Set a 2D range of data."""
+        # ws.append writes at column 1 of the row after the last one used
+        if start_col == 1 and start_row == self._last_rows.get(self.ws, 0) + 1:
+            return self.write_rows_bulk(data, header=header)
+        self._require_random_access("set_data_range at an arbitrary position")
+        
         for i, row_data in enumerate(data):
             self.set_row_data(
                 row=start_row + i,
@@ -135,22 +254,26 @@ class ExcelEngine:
     
     def set_row_height(self, row: int, height: float):
         """Set row height."""
+        self._require_random_access("set_row_height")
         self.ws.row_dimensions[row].height = height
         return self
     
     def auto_fit_columns(self, min_width: int = 10, max_width: int = 50):
         """Auto-fit column widths based on content."""
-        for column in self.ws.columns:
-            max_length = 0
-            column_letter = get_column_letter(column[0].column)
-            for cell in column:
-                try:
-                    if len(str(cell.value)) > max_length:
-                        max_length = len(str(cell.value))
-                except (TypeError, AttributeError):
-                    continue  # Skip cells with non-stringifiable values
+        self._require_random_access("auto_fit_columns")
+        # Single row-major pass over raw values; no per-column generators or Cell lookups
+        widths = [0] * self.ws.max_column
+        for row in self.ws.iter_rows(values_only=True):
+            for i, value in enumerate(row):
+                if value is None:
+                    continue
+                length = len(value) if isinstance(value, str) else len(str(value))
+                if length > widths[i]:
+                    widths[i] = length
+        
+        for i, max_length in enumerate(widths, 1):
             adjusted_width = min(max(max_length + 2, min_width), max_width)
-            self.ws.column_dimensions[column_letter].width = adjusted_width
+            self.ws.column_dimensions[get_column_letter(i)].width = adjusted_width
         return self
     
     # ==================== BORDERS ====================
@@ -164,12 +287,13 @@ class ExcelEngine:
         style: str = 'thin'
     ):
         """Add borders to a range of cells."""
-        side = Side(style=style)
-        border = Border(left=side, right=side, top=side, bottom=side)
+        self._require_random_access("add_borders")
+        border = self._border(style)
         
         for row in range(start_row, end_row + 1):
             for col in range(start_col, end_col + 1):
                 self.ws.cell(row=row, column=col).border = border
+        self._mark_row(end_row)
         return self
     
     # ==================== CHARTS ====================
@@ -198,15 +322,17 @@ class ExcelEngine:
     
     def save(self, filepath: str):
         """Save workbook to file."""
-        self.wb.save(filepath)
-        return filepath
+        return save_sequential(filepath, self.wb.save)
+    
+    def save_to_stream(self, fileobj):
+        """Save workbook into a writable binary file object (e.g. a response body)."""
+        self.wb.save(fileobj)
+        return fileobj
     
     def save_to_bytes(self) -> bytes:
         """Save workbook to bytes (for streaming)."""
-        buffer = BytesIO()
-        self.wb.save(buffer)
-        buffer.seek(0)
-        return buffer.getvalue()
+        # getvalue() hands over the buffer without a copy when nothing else references it
+        return self.save_to_stream(BytesIO()).getvalue()
     
     def create_blank(self):
         """Return the underlying workbook object."""
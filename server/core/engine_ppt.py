@@ -3,8 +3,146 @@ from pptx.util import Inches, Pt, Cm
 from pptx.dml.color import RGBColor
 from pptx.enum.text import PP_ALIGN, MSO_ANCHOR
 from pptx.enum.shapes import MSO_SHAPE
-from typing import Optional, List, Tuple
+from typing import Optional, List, Tuple, Dict, Any
+from pptx.oxml.ns import qn
+from pptx.opc.constants import RELATIONSHIP_TYPE as RT
+from pptx.parts.slide import SlidePart
+from pptx.table import _Cell
+from pptx.shapes.autoshape import AutoShapeType
+from pptx.oxml.shapes.autoshape import CT_Shape
 from io import BytesIO
+from lxml import etree
+from copy import deepcopy
+from functools import lru_cache
+import re
+import threading
+from core.fileio import save_sequential
+
+# Qualified element/attribute names, resolved once at import instead of per qn() call
+_QN_LATIN = qn('a:latin')
+_QN_P = qn('a:p')
+_QN_R = qn('a:r')
+_QN_SOLIDFILL = qn('a:solidFill')
+_QN_SRGBCLR = qn('a:srgbClr')
+_QN_T = qn('a:t')
+
+# Text the text-frame setter must translate (line/paragraph breaks) or that XML cannot hold
+_CONTROL_CHARS = re.compile(r'[\x00-\x1f]')
+
+
+@lru_cache(maxsize=512)
+def _emu_inches_cached(v: float) -> int:
+    return Inches(v)
+
+
+@lru_cache(maxsize=512)
+def _emu_cm_cached(v: float) -> int:
+    return Cm(v)
+
+
+@lru_cache(maxsize=512)
+def _emu_pt_cached(v: float) -> int:
+    return Pt(v)
+
+
+# Sizes repeat heavily across slides/paragraphs; rounding the input maximizes cache hits
+def _emu_inches(v: float) -> int:
+    return _emu_inches_cached(round(v, 4))
+
+
+def _emu_cm(v: float) -> int:
+    return _emu_cm_cached(round(v, 4))
+
+
+def _emu_pt(v: float) -> int:
+    return _emu_pt_cached(round(v, 4))
+
+
+# Builds run in worker threads; the shared template is only ever touched under this lock
+_template_lock = threading.Lock()
+
+
+@lru_cache(maxsize=None)
+def _template_presentation():
+    """The default template, parsed once; never modify it, only copy it (under _template_lock)."""
+    return Presentation()
+
+
+def _new_presentation():
+    """A fresh presentation: copying the parsed template is several times faster than re-reading the package."""
+    with _template_lock:
+        return deepcopy(_template_presentation())
+
+
+@lru_cache(maxsize=256)
+def _rgb(color: str) -> RGBColor:
+    """RGBColor for a hex string with or without a leading '#'; documents reuse a small palette."""
+    return RGBColor.from_string(color.lstrip('#'))
+
+
+def _fill_new_cell(cell, text: str):
+    """
+    Write text into a freshly created table cell by appending one <a:r> to its empty paragraph,
+    instead of the cell.text setter's clear-and-rebuild. Control characters take the setter path.
+    """
+    if _CONTROL_CHARS.search(text):
+        cell.text = text
+        return
+    
+    r = etree.SubElement(cell._tc.txBody.find(_QN_P), _QN_R)
+    etree.SubElement(r, _QN_T).text = text
+
+
+def _apply_run_props(
+    run,
+    font_name: Optional[str] = None,
+    font_size: Optional[float] = None,
+    bold: bool = False,
+    italic: bool = False,
+    color: Optional[str] = None
+):
+    """
+    Write a new run's font properties into its a:rPr in one pass, in schema order,
+    instead of going through one run.font setter per property. Produces the same XML.
+    """
+    rPr = run._r.get_or_add_rPr()
+    if font_size:
+        rPr.set('sz', str(_emu_pt(font_size).centipoints))
+    rPr.set('b', '1' if bold else '0')
+    rPr.set('i', '1' if italic else '0')
+    if color:
+        fill = etree.SubElement(rPr, _QN_SOLIDFILL)
+        etree.SubElement(fill, _QN_SRGBCLR, val=str(_rgb(color)))
+    if font_name:
+        etree.SubElement(rPr, _QN_LATIN, typeface=font_name)
+
+
+_ALIGNMENTS = {
+    'left': PP_ALIGN.LEFT,
+    'center': PP_ALIGN.CENTER,
+    'right': PP_ALIGN.RIGHT
+}
+
+_SHAPES = {
+    'rectangle': MSO_SHAPE.RECTANGLE,
+    'oval': MSO_SHAPE.OVAL,
+    'rounded_rectangle': MSO_SHAPE.ROUNDED_RECTANGLE,
+    'triangle': MSO_SHAPE.ISOSCELES_TRIANGLE
+}
+
+# shape_type -> (name prefix, <p:sp> template); add_shape deep-copies one and fills in id, name and geometry
+_SHAPE_TEMPLATES = {
+    key: (AutoShapeType(shape).basename, CT_Shape.new_autoshape_sp(0, '', AutoShapeType(shape).prst, 0, 0, 0, 0))
+    for key, shape in _SHAPES.items()
+}
+
+
+def _placeholder(slide, idx: int):
+    """The slide's placeholder with the given idx, or None. Stops at the match instead of listing them all."""
+    try:
+        return slide.placeholders[idx]
+    except KeyError:
+        return None
 
 
 class PPTEngine:
@@ -14,23 +152,30 @@ class PPTEngine:
     """
     
     def __init__(self):
-        self.prs = Presentation()
+        self.prs = _new_presentation()
         self.current_slide = None
+        self._reset_part_caches()
         self._set_default_size()
     
+    def _reset_part_caches(self):
+        """Drop caches that hold parts of self.prs; call whenever the presentation is replaced."""
+        # layout_index -> slide layout, and a pristine copy of the shape tree a new slide gets from it
+        self._layouts: Dict[int, Any] = {}
+        self._slide_skeletons: Dict[int, Any] = {}
+    
     def _set_default_size(self):
         """Set default slide size (16:9)."""
-        self.prs.slide_width = Inches(13.333)
-        self.prs.slide_height = Inches(7.5)
+        self.prs.slide_width = _emu_inches(13.333)
+        self.prs.slide_height = _emu_inches(7.5)
     
     def set_slide_size(self, width: float, height: float, unit: str = 'inches'):
         """Set custom slide size."""
         if unit == 'cm':
-            self.prs.slide_width = Cm(width)
-            self.prs.slide_height = Cm(height)
+            self.prs.slide_width = _emu_cm(width)
+            self.prs.slide_height = _emu_cm(height)
         else:
-            self.prs.slide_width = Inches(width)
-            self.prs.slide_height = Inches(height)
+            self.prs.slide_width = _emu_inches(width)
+            self.prs.slide_height = _emu_inches(height)
         return self
     
     # ==================== SLIDE OPERATIONS ====================
@@ -44,16 +189,40 @@ class PPTEngine:
         3 = Two Content, 4 = Comparison, 5 = Title Only, 6 = Blank,
         7 = Content with Caption, 8 = Picture with Caption
         """
-        slide_layout = self.prs.slide_layouts[layout_index]
-        self.current_slide = self.prs.slides.add_slide(slide_layout)
-        return self.current_slide
+        layout = self._layouts.get(layout_index)
+        if layout is None:
+            layout = self._layouts[layout_index] = self.prs.slide_layouts[layout_index]
+        
+        skeleton = self._slide_skeletons.get(layout_index)
+        if skeleton is None:
+            slide = self.prs.slides.add_slide(layout)
+            self._slide_skeletons[layout_index] = deepcopy(slide.shapes._spTree)
+        else:
+            # Same steps as slides.add_slide, but the layout's placeholders are copied from the
+            # skeleton instead of being cloned one by one from the layout
+            prs_part = self.prs.part
+            slide_part = SlidePart.new(prs_part._next_slide_partname, prs_part.package, layout.part)
+            rId = prs_part.relate_to(slide_part, RT.SLIDE)
+            # Swap the tree in before slide.shapes (a lazy property bound to the old tree) is touched
+            spTree = slide_part._element.cSld.spTree
+            spTree.getparent().replace(spTree, deepcopy(skeleton))
+            slide = slide_part.slide
+            self.prs.slides._sldIdLst.add_sldId(rId)
+        
+        # Shapes are only ever added through this SlideShapes object, so it can keep a running
+        # max shape id instead of rescanning every id on the slide for each new shape
+        slide.shapes.turbo_add_enabled = True
+        self.current_slide = slide
+        return slide
     
     def add_title_slide(self, title: str, subtitle: str = ''):
         """Add a title slide."""
         slide = self.add_slide(layout_index=0)
         slide.shapes.title.text = title
-        if subtitle and len(slide.placeholders) > 1:
-            slide.placeholders[1].text = subtitle
+        if subtitle:
+            sub = _placeholder(slide, 1)
+            if sub is not None:
+                sub.text = subtitle
         return slide
     
     def add_content_slide(self, title: str, content: List[str]):
@@ -61,19 +230,41 @@ class PPTEngine:
         slide = self.add_slide(layout_index=1)
         slide.shapes.title.text = title
         
-        if len(slide.placeholders) > 1:
-            body = slide.placeholders[1]
+        body = _placeholder(slide, 1)
+        if body is not None:
+            items = [str(item) for item in content]
             tf = body.text_frame
-            tf.clear()
-            for i, item in enumerate(content):
-                if i == 0:
-                    tf.paragraphs[0].text = item
-                else:
-                    p = tf.add_paragraph()
+            if any(_CONTROL_CHARS.search(item) for item in items):
+                # The paragraph text setter turns line breaks into <a:br/>
+                tf.clear()
+                for i, item in enumerate(items):
+                    p = tf.paragraphs[0] if i == 0 else tf.add_paragraph()
                     p.text = item
-                    p.level = 0
+            else:
+                # Build every bullet paragraph up front and swap them in at once
+                txBody = tf._txBody
+                for p in txBody.findall(_QN_P):
+                    txBody.remove(p)
+                paragraphs = []
+                for item in items or ['']:
+                    p = etree.Element(_QN_P)
+                    if item:
+                        etree.SubElement(etree.SubElement(p, _QN_R), _QN_T).text = item
+                    paragraphs.append(p)
+                txBody.extend(paragraphs)
         return slide
     
+    def add_slide_from_spec(self, spec: dict):
+        """Add a slide from a spec dict: {'type': 'title' | 'content', 'title': ..., 'content': [...]}."""
+        title = spec.get('title', 'Slide')
+        content = spec.get('content', [])
+        if not isinstance(content, list):
+            content = [content]
+        
+        if spec.get('type') == 'title':
+            return self.add_title_slide(title, content[0] if content else '')
+        return self.add_content_slide(title, content)
+    
     # ==================== TEXT BOX OPERATIONS ====================
     
     def add_text_box(
@@ -96,7 +287,7 @@ class PPTEngine:
             self.add_slide()
         
         # Convert units
-        conv = Cm if unit == 'cm' else Inches
+        conv = _emu_cm if unit == 'cm' else _emu_inches
         
         textbox = self.current_slide.shapes.add_textbox(
             conv(left), conv(top), conv(width), conv(height)
@@ -108,23 +299,10 @@ class PPTEngine:
         p.text = text
         
         # Alignment
-        align_map = {
-            'left': PP_ALIGN.LEFT,
-            'center': PP_ALIGN.CENTER,
-            'right': PP_ALIGN.RIGHT
-        }
-        p.alignment = align_map.get(alignment, PP_ALIGN.LEFT)
+        p.alignment = _ALIGNMENTS.get(alignment, PP_ALIGN.LEFT)
         
         # Font formatting
-        run = p.runs[0]
-        if font_name:
-            run.font.name = font_name
-        if font_size:
-            run.font.size = Pt(font_size)
-        run.font.bold = bold
-        run.font.italic = italic
-        if color:
-            run.font.color.rgb = RGBColor.from_string(color.lstrip('#'))
+        _apply_run_props(p.runs[0], font_name, font_size, bold, italic, color)
         
         return textbox
     
@@ -148,25 +326,30 @@ class PPTEngine:
         if self.current_slide is None:
             self.add_slide()
         
-        conv = Cm if unit == 'cm' else Inches
+        conv = _emu_cm if unit == 'cm' else _emu_inches
         
-        shape_map = {
-            'rectangle': MSO_SHAPE.RECTANGLE,
-            'oval': MSO_SHAPE.OVAL,
-            'rounded_rectangle': MSO_SHAPE.ROUNDED_RECTANGLE,
-            'triangle': MSO_SHAPE.ISOSCELES_TRIANGLE
-        }
+        basename, template = _SHAPE_TEMPLATES.get(shape_type, _SHAPE_TEMPLATES['rectangle'])
+        shapes = self.current_slide.shapes
         
-        shape = self.current_slide.shapes.add_shape(
-            shape_map.get(shape_type, MSO_SHAPE.RECTANGLE),
-            conv(left), conv(top), conv(width), conv(height)
-        )
+        # Same element shapes.add_shape + fill.solid() builds, copied from a template
+        sp = deepcopy(template)
+        shape_id = shapes._next_shape_id
+        cNvPr = sp.nvSpPr.cNvPr
+        cNvPr.set('id', str(shape_id))
+        cNvPr.set('name', f'{basename} {shape_id - 1}')
+        xfrm = sp.spPr.xfrm
+        xfrm.off.set('x', str(conv(left)))
+        xfrm.off.set('y', str(conv(top)))
+        xfrm.ext.set('cx', str(conv(width)))
+        xfrm.ext.set('cy', str(conv(height)))
         
         if fill_color:
-            shape.fill.solid()
-            shape.fill.fore_color.rgb = RGBColor.from_string(fill_color.lstrip('#'))
+            fill = etree.Element(_QN_SOLIDFILL)
+            etree.SubElement(fill, _QN_SRGBCLR, val=str(_rgb(fill_color)))
+            sp.spPr.prstGeom.addnext(fill)
         
-        return shape
+        shapes._spTree.insert_element_before(sp, 'p:extLst')
+        return shapes._shape_factory(sp)
     
     # ==================== IMAGE OPERATIONS ====================
     
@@ -183,7 +366,7 @@ class PPTEngine:
         if self.current_slide is None:
             self.add_slide()
         
-        conv = Cm if unit == 'cm' else Inches
+        conv = _emu_cm if unit == 'cm' else _emu_inches
         
         kwargs = {'left': conv(left), 'top': conv(top)}
         if width:
@@ -191,6 +374,7 @@ class PPTEngine:
         if height:
             kwargs['height'] = conv(height)
         
+        # python-pptx reuses the part of an identical image already in the package (by SHA-1)
         return self.current_slide.shapes.add_picture(image_path, **kwargs)
     
     # ==================== TABLE OPERATIONS ====================
@@ -208,7 +392,7 @@ class PPTEngine:
         if self.current_slide is None:
             self.add_slide()
         
-        conv = Cm if unit == 'cm' else Inches
+        conv = _emu_cm if unit == 'cm' else _emu_inches
         
         rows = len(data)
         cols = len(data[0]) if data else 0
@@ -218,9 +402,13 @@ class PPTEngine:
             conv(left), conv(top), conv(width), conv(height)
         ).table
         
-        for i, row_data in enumerate(data):
-            for j, cell_text in enumerate(row_data):
-                table.cell(i, j).text = str(cell_text)
+        # Walk the a:tr/a:tc grid once; table.cell(i, j) re-lists every row for each cell
+        for tr, row_data in zip(table._tbl.tr_lst, data):
+            for tc, cell_text in zip(tr.tc_lst, row_data):
+                # data is typed List[List[str]]; only coerce the odd non-string value
+                if type(cell_text) is not str:
+                    cell_text = str(cell_text)
+                _fill_new_cell(_Cell(tc, table), cell_text)
         
         return table
     
@@ -228,15 +416,17 @@ class PPTEngine:
     
     def save(self, filepath: str):
         """Save presentation to file."""
-        self.prs.save(filepath)
-        return filepath
+        return save_sequential(filepath, self.prs.save)
+    
+    def save_to_stream(self, fileobj):
+        """Save presentation into a writable binary file object (e.g. a response body)."""
+        self.prs.save(fileobj)
+        return fileobj
     
     def save_to_bytes(self) -> bytes:
         """Save presentation to bytes (for streaming)."""
-        buffer = BytesIO()
-        self.prs.save(buffer)
-        buffer.seek(0)
-        return buffer.getvalue()
+        # getvalue() hands over the buffer without a copy when nothing else references it
+        return self.save_to_stream(BytesIO()).getvalue()
     
     def create_blank(self):
         """Return the underlying presentation object."""
@@ -5,9 +5,176 @@ from docx.enum.style import WD_STYLE_TYPE
 from docx.enum.table import WD_TABLE_ALIGNMENT
 from docx.oxml.ns import qn
 from docx.oxml import OxmlElement
+from docx.oxml.shape import CT_Inline
+from docx.opc.constants import RELATIONSHIP_TYPE as RT
+from docx.shape import InlineShape
+from docx.text.paragraph import Paragraph
+from docx.image.image import Image
 from typing import Optional, List, Dict, Any
 from io import BytesIO
+from lxml import etree
+from copy import deepcopy
+from concurrent.futures import ThreadPoolExecutor
 import os
+import re
+import threading
+from functools import lru_cache
+from core.fileio import save_sequential
+
+# Qualified element/attribute names, resolved once at import instead of per qn() call
+_QN_ASCII = qn('w:ascii')
+_QN_B = qn('w:b')
+_QN_BOTTOM = qn('w:bottom')
+_QN_COLOR = qn('w:color')
+_QN_EASTASIA = qn('w:eastAsia')
+_QN_H = qn('w:h')
+_QN_HANSI = qn('w:hAnsi')
+_QN_I = qn('w:i')
+_QN_LEFT = qn('w:left')
+_QN_P = qn('w:p')
+_QN_R = qn('w:r')
+_QN_RFONTS = qn('w:rFonts')
+_QN_RIGHT = qn('w:right')
+_QN_RPR = qn('w:rPr')
+_QN_SECTPR = qn('w:sectPr')
+_QN_SZ = qn('w:sz')
+_QN_T = qn('w:t')
+_QN_TOP = qn('w:top')
+_QN_U = qn('w:u')
+_QN_VAL = qn('w:val')
+_QN_W = qn('w:w')
+_QN_XML_SPACE = qn('xml:space')
+
+
+# Text the run.text setter must translate (tabs, breaks) or that XML cannot hold
+_CONTROL_CHARS = re.compile(r'[\x00-\x1f]')
+
+
+@lru_cache(maxsize=512)
+def _emu_inches_cached(v: float) -> int:
+    return Inches(v)
+
+
+@lru_cache(maxsize=512)
+def _emu_cm_cached(v: float) -> int:
+    return Cm(v)
+
+
+@lru_cache(maxsize=512)
+def _emu_pt_cached(v: float) -> int:
+    return Pt(v)
+
+
+# Sizes repeat heavily across slides/paragraphs; rounding the input maximizes cache hits
+def _emu_inches(v: float) -> int:
+    return _emu_inches_cached(round(v, 4))
+
+
+def _emu_cm(v: float) -> int:
+    return _emu_cm_cached(round(v, 4))
+
+
+def _emu_pt(v: float) -> int:
+    return _emu_pt_cached(round(v, 4))
+
+
+# Builds run in worker threads; the shared template is only ever touched under this lock
+_template_lock = threading.Lock()
+
+
+@lru_cache(maxsize=None)
+def _template_document():
+    """The default template, parsed once; never modify it, only copy it (under _template_lock)."""
+    return Document()
+
+
+def _new_document():
+    """A fresh document: copying the parsed template is several times faster than re-reading the package."""
+    with _template_lock:
+        return deepcopy(_template_document())
+
+
+@lru_cache(maxsize=256)
+def _rgb(color: str) -> RGBColor:
+    """RGBColor for a hex string with or without a leading '#'; documents reuse a small palette."""
+    return RGBColor.from_string(color.lstrip('#'))
+
+
+def _fill_new_cell(cell, text: str, bold: bool = False):
+    """
+    Write text into a freshly created table cell by appending one <w:r> to its empty paragraph,
+    instead of the cell.text setter's clear-and-rebuild. Control characters take the setter path.
+    """
+    if _CONTROL_CHARS.search(text):
+        cell.text = text
+        if bold:
+            for r in cell._tc.iter(_QN_R):
+                r.get_or_add_rPr().get_or_add_b()
+        return
+    
+    r = etree.SubElement(cell._tc.find(_QN_P), _QN_R)
+    if bold:
+        etree.SubElement(etree.SubElement(r, _QN_RPR), _QN_B)
+    t = etree.SubElement(r, _QN_T)
+    if text != text.strip():
+        t.set(_QN_XML_SPACE, 'preserve')
+    t.text = text
+
+
+def _apply_run_props(
+    run,
+    font_name: Optional[str] = None,
+    font_size: Optional[float] = None,
+    bold: bool = False,
+    italic: bool = False,
+    underline: bool = False,
+    color: Optional[str] = None
+):
+    """
+    Write a new run's font properties into its w:rPr in one pass, in schema order,
+    instead of going through one run.font setter per property. Produces the same XML.
+    """
+    rPr = run._r.get_or_add_rPr()
+    if font_name:
+        etree.SubElement(rPr, _QN_RFONTS, {_QN_ASCII: font_name, _QN_HANSI: font_name, _QN_EASTASIA: font_name})
+    b = etree.SubElement(rPr, _QN_B)
+    if not bold:
+        b.set(_QN_VAL, '0')
+    i = etree.SubElement(rPr, _QN_I)
+    if not italic:
+        i.set(_QN_VAL, '0')
+    if color:
+        etree.SubElement(rPr, _QN_COLOR, {_QN_VAL: str(_rgb(color))})
+    if font_size:
+        etree.SubElement(rPr, _QN_SZ, {_QN_VAL: str(int(_emu_pt(font_size).pt * 2))})
+    etree.SubElement(rPr, _QN_U, {_QN_VAL: 'single' if underline else 'none'})
+
+
+# Reads and parses images for add_image(defer=True); threads start on first use
+_IMAGE_IO_POOL = ThreadPoolExecutor(max_workers=min(8, os.cpu_count() or 1), thread_name_prefix='word-image')
+
+
+def _load_image(image_path: str) -> Image:
+    """Read and parse an image file."""
+    return Image.from_file(image_path)
+
+
+_ALIGNMENTS = {
+    'left': WD_ALIGN_PARAGRAPH.LEFT,
+    'center': WD_ALIGN_PARAGRAPH.CENTER,
+    'right': WD_ALIGN_PARAGRAPH.RIGHT,
+    'justify': WD_ALIGN_PARAGRAPH.JUSTIFY
+}
+
+# line_spacing_rule -> (WD_LINE_SPACING rule, converter for the line_spacing value or None if the rule fixes it)
+_LINE_SPACING_RULES = {
+    'single': (WD_LINE_SPACING.SINGLE, None),
+    'double': (WD_LINE_SPACING.DOUBLE, None),
+    '1.5': (WD_LINE_SPACING.ONE_POINT_FIVE, None),
+    'exact': (WD_LINE_SPACING.EXACTLY, _emu_pt),
+    'at_least': (WD_LINE_SPACING.AT_LEAST, _emu_pt),
+    'multiple': (WD_LINE_SPACING.MULTIPLE, float),
+}
 
 
 class WordEngine:
@@ -16,18 +183,39 @@ class WordEngine:
     Supports: fonts, sizes, colors, spacing, margins, tables, images, and more.
     """
     
-    def __init__(self):
-        self.doc = Document()
-        self._setup_default_styles()
+    def __init__(self, skip_default_styles: bool = False):
+        """
+        Args:
+            skip_default_styles: Leave the Normal style untouched, for callers that set their own
+        """
+        self.doc = _new_document()
+        # (future from _load_image, reserved w:r, width, height) for deferred add_image calls
+        self._pending_images: List[tuple] = []
+        if not skip_default_styles:
+            self._setup_default_styles()
     
     def _setup_default_styles(self):
         """Set up default document styles."""
         # Set default font for the document
-        style = self.doc.styles['Normal']
-        style.font.name = 'Arial'
-        style.font.size = Pt(11)
+        # Written straight into the Normal style's rPr: font.name/font.size re-resolve it per setter
+        rPr = self.doc.styles['Normal']._element.get_or_add_rPr()
+        rFonts = rPr.rFonts
+        sz = rPr.sz
+        if (
+            rFonts is not None and sz is not None
+            and rFonts.get(_QN_ASCII) == rFonts.get(_QN_HANSI) == 'Arial'
+            and rFonts.get(_QN_EASTASIA) == '微软雅黑'
+            and sz.get(_QN_VAL) == '22'
+        ):
+            # The template already carries these defaults
+            return
+        
+        rFonts = rPr.get_or_add_rFonts()
+        rFonts.set(_QN_ASCII, 'Arial')
+        rFonts.set(_QN_HANSI, 'Arial')
         # For Chinese font support
-        style._element.rPr.rFonts.set(qn('w:eastAsia'), '微软雅黑')
+        rFonts.set(_QN_EASTASIA, '微软雅黑')
+        rPr.get_or_add_sz().set(_QN_VAL, '22')  # 11pt, in half-points
     
     # ==================== PAGE SETUP ====================
     
@@ -46,29 +234,28 @@ class WordEngine:
             top, bottom, left, right: Margin values
             unit: 'cm' or 'inches'
         """
-        sections = self.doc.sections
-        for section in sections:
-            if unit == 'cm':
-                section.top_margin = Cm(top)
-                section.bottom_margin = Cm(bottom)
-                section.left_margin = Cm(left)
-                section.right_margin = Cm(right)
-            else:
-                section.top_margin = Inches(top)
-                section.bottom_margin = Inches(bottom)
-                section.left_margin = Inches(left)
-                section.right_margin = Inches(right)
+        conv = _emu_cm if unit == 'cm' else _emu_inches
+        margins = {
+            _QN_TOP: str(conv(top).twips),
+            _QN_BOTTOM: str(conv(bottom).twips),
+            _QN_LEFT: str(conv(left).twips),
+            _QN_RIGHT: str(conv(right).twips),
+        }
+        # Write w:pgMar once per section rather than through four property setters
+        for section in self.doc.sections:
+            pgMar = section._sectPr.get_or_add_pgMar()
+            for attr, value in margins.items():
+                pgMar.set(attr, value)
         return self
     
     def set_page_size(self, width: float, height: float, unit: str = 'cm'):
         """Set page size (A4 default: 21.0 x 29.7 cm)."""
+        conv = _emu_cm if unit == 'cm' else _emu_inches
+        w, h = str(conv(width).twips), str(conv(height).twips)
         for section in self.doc.sections:
-            if unit == 'cm':
-                section.page_width = Cm(width)
-                section.page_height = Cm(height)
-            else:
-                section.page_width = Inches(width)
-                section.page_height = Inches(height)
+            pgSz = section._sectPr.get_or_add_pgSz()
+            pgSz.set(_QN_W, w)
+            pgSz.set(_QN_H, h)
         return self
     
     # ==================== PARAGRAPH OPERATIONS ====================
@@ -109,59 +296,70 @@ class WordEngine:
         run = paragraph.add_run(text)
         
         # Font settings
-        if font_name:
-            run.font.name = font_name
-            run._element.rPr.rFonts.set(qn('w:eastAsia'), font_name)
-        if font_size:
-            run.font.size = Pt(font_size)
-        
-        run.font.bold = bold
-        run.font.italic = italic
-        run.font.underline = underline
-        
-        if color:
-            run.font.color.rgb = RGBColor.from_string(color.lstrip('#'))
+        _apply_run_props(run, font_name, font_size, bold, italic, underline, color)
         
         # Paragraph alignment
-        alignment_map = {
-            'left': WD_ALIGN_PARAGRAPH.LEFT,
-            'center': WD_ALIGN_PARAGRAPH.CENTER,
-            'right': WD_ALIGN_PARAGRAPH.RIGHT,
-            'justify': WD_ALIGN_PARAGRAPH.JUSTIFY
-        }
-        paragraph.alignment = alignment_map.get(alignment, WD_ALIGN_PARAGRAPH.LEFT)
+        paragraph.alignment = _ALIGNMENTS.get(alignment, WD_ALIGN_PARAGRAPH.LEFT)
         
         # Line spacing
         pf = paragraph.paragraph_format
         if line_spacing:
-            if line_spacing_rule == 'single':
-                pf.line_spacing_rule = WD_LINE_SPACING.SINGLE
-            elif line_spacing_rule == 'double':
-                pf.line_spacing_rule = WD_LINE_SPACING.DOUBLE
-            elif line_spacing_rule == '1.5':
-                pf.line_spacing_rule = WD_LINE_SPACING.ONE_POINT_FIVE
-            elif line_spacing_rule == 'exact':
-                pf.line_spacing_rule = WD_LINE_SPACING.EXACTLY
-                pf.line_spacing = Pt(line_spacing)
-            elif line_spacing_rule == 'at_least':
-                pf.line_spacing_rule = WD_LINE_SPACING.AT_LEAST
-                pf.line_spacing = Pt(line_spacing)
-            else:  # multiple
-                pf.line_spacing_rule = WD_LINE_SPACING.MULTIPLE
-                pf.line_spacing = line_spacing
+            rule, convert = _LINE_SPACING_RULES.get(line_spacing_rule, _LINE_SPACING_RULES['multiple'])
+            pf.line_spacing_rule = rule
+            if convert is not None:
+                pf.line_spacing = convert(line_spacing)
         
         # Paragraph spacing
         if space_before is not None:
-            pf.space_before = Pt(space_before)
+            pf.space_before = _emu_pt(space_before)
         if space_after is not None:
-            pf.space_after = Pt(space_after)
+            pf.space_after = _emu_pt(space_after)
         
         # First line indent
         if first_line_indent is not None:
-            pf.first_line_indent = Cm(first_line_indent)
+            pf.first_line_indent = _emu_cm(first_line_indent)
         
         return paragraph
     
+    def add_many_paragraphs(self, items: List[Dict[str, Any]]) -> List[Paragraph]:
+        """
+        Add several paragraphs at once. Each item holds add_paragraph's keyword arguments.
+        
+        The first paragraph of each distinct formatting is built by add_paragraph and kept as a
+        template; the rest are deep copies of it with only the text replaced. All paragraphs are
+        inserted into the body in one slice assignment.
+        """
+        body = self.doc.element.body
+        templates: Dict[tuple, Any] = {}
+        paragraphs = []
+        
+        for item in items:
+            text = str(item.get('text', ''))
+            fmt = tuple(sorted((k, v) for k, v in item.items() if k != 'text'))
+            template = templates.get(fmt)
+            
+            if template is not None and text and not _CONTROL_CHARS.search(text):
+                p = deepcopy(template)
+                t = p.find(f"{_QN_R}/{_QN_T}")
+                if text != text.strip():
+                    t.set(_QN_XML_SPACE, 'preserve')
+                else:
+                    t.attrib.pop(_QN_XML_SPACE, None)
+                t.text = text
+            else:
+                # The setter path handles empty text and tabs/breaks; detach it for the batch insert
+                p = self.add_paragraph(text, **dict(fmt))._p
+                body.remove(p)
+                if text and not _CONTROL_CHARS.search(text):
+                    templates[fmt] = p
+            paragraphs.append(p)
+        
+        # add_paragraph inserts before the trailing sectPr; keep that invariant
+        sectPr = body.find(_QN_SECTPR)
+        at = body.index(sectPr) if sectPr is not None else len(body)
+        body[at:at] = paragraphs
+        return [Paragraph(p, self.doc._body) for p in paragraphs]
+    
     def add_heading(
         self,
         text: str,
@@ -173,15 +371,16 @@ class WordEngine:
         """Add a heading with optional custom formatting."""
         heading = self.doc.add_heading(text, level=level)
         
-        if font_name or font_size or color:
-            for run in heading.runs:
-                if font_name:
-                    run.font.name = font_name
-                    run._element.rPr.rFonts.set(qn('w:eastAsia'), font_name)
-                if font_size:
-                    run.font.size = Pt(font_size)
-                if color:
-                    run.font.color.rgb = RGBColor.from_string(color.lstrip('#'))
+        if text and (font_name or font_size or color):
+            # Document.add_heading writes the text as one run, so there is nothing to iterate
+            run = heading.runs[0]
+            if font_name:
+                run.font.name = font_name
+                run._element.rPr.rFonts.set(_QN_EASTASIA, font_name)
+            if font_size:
+                run.font.size = _emu_pt(font_size)
+            if color:
+                run.font.color.rgb = _rgb(color)
         
         return heading
     
@@ -212,22 +411,25 @@ class WordEngine:
         table = self.doc.add_table(rows=rows, cols=cols)
         table.style = style
         
+        # Materialize the cell grid once; row.cells / table.columns re-walk the XML on every access
+        cells = table._cells
+        
         # Set column widths if provided
         if col_widths:
-            for i, width in enumerate(col_widths):
-                for cell in table.columns[i].cells:
-                    cell.width = Cm(width)
+            for i, width in enumerate(col_widths[:cols]):
+                width = _emu_cm(width)
+                for r in range(rows):
+                    cells[r * cols + i].width = width
         
         # Populate table
         for i, row_data in enumerate(data):
-            row = table.rows[i]
-            for j, cell_text in enumerate(row_data):
-                row.cells[j].text = str(cell_text)
+            row_cells = cells[i * cols:(i + 1) * cols]
+            for cell, cell_text in zip(row_cells, row_data):
+                # data is typed List[List[str]]; only coerce the odd non-string value
+                if type(cell_text) is not str:
+                    cell_text = str(cell_text)
                 # Bold header row
-                if header and i == 0:
-                    for paragraph in row.cells[j].paragraphs:
-                        for run in paragraph.runs:
-                            run.font.bold = True
+                _fill_new_cell(cell, cell_text, bold=(header and i == 0))
         
         return table
     
@@ -238,34 +440,72 @@ class WordEngine:
         image_path: str,
         width: Optional[float] = None,
         height: Optional[float] = None,
-        unit: str = 'cm'
+        unit: str = 'cm',
+        defer: bool = False
     ):
-        """Add an image to the document."""
+        """
+        Add an image to the document.
+        
+        With defer=True the file is read and parsed on a background thread while the
+        document is built further; the picture is placed in its reserved paragraph when the
+        document is saved, and None is returned instead of the InlineShape.
+        """
         if width and unit == 'cm':
-            width = Cm(width)
+            width = _emu_cm(width)
         elif width and unit == 'inches':
-            width = Inches(width)
+            width = _emu_inches(width)
         
         if height and unit == 'cm':
-            height = Cm(height)
+            height = _emu_cm(height)
         elif height and unit == 'inches':
-            height = Inches(height)
+            height = _emu_inches(height)
+        
+        r = self.doc.add_paragraph().add_run()._r
+        if defer:
+            self._pending_images.append((_IMAGE_IO_POOL.submit(_load_image, image_path), r, width, height))
+            return None
         
-        return self.doc.add_picture(image_path, width=width, height=height)
+        # python-docx reuses the part of an identical image already in the package (by SHA-1)
+        image_part = self.doc.part.package.get_or_add_image_part(image_path)
+        return self._place_image(r, image_part, width, height)
+    
+    def _place_image(self, r, image_part, width, height) -> InlineShape:
+        """Relate image_part to the document and put its picture into run r."""
+        part = self.doc.part
+        rId = part.relate_to(image_part, RT.IMAGE)
+        image = image_part.image
+        cx, cy = image.scaled_dimensions(width, height)
+        inline = CT_Inline.new_pic_inline(part.next_id, rId, image.filename, cx, cy)
+        r.add_drawing(inline)
+        return InlineShape(inline)
+    
+    def _flush_pending_images(self):
+        """Embed the pictures of deferred add_image calls, in the order they were added."""
+        image_parts = self.doc.part.package.image_parts
+        for future, r, width, height in self._pending_images:
+            image = future.result()
+            # Same lookup get_or_add_image_part does, with the image already parsed
+            image_part = image_parts._get_by_sha1(image.sha1) or image_parts._add_image_part(image)
+            self._place_image(r, image_part, width, height)
+        self._pending_images.clear()
     
     # ==================== SAVE OPERATIONS ====================
     
     def save(self, filepath: str):
         """Save document to file."""
-        self.doc.save(filepath)
-        return filepath
+        self._flush_pending_images()
+        return save_sequential(filepath, self.doc.save)
+    
+    def save_to_stream(self, fileobj):
+        """Save document into a writable binary file object (e.g. a response body)."""
+        self._flush_pending_images()
+        self.doc.save(fileobj)
+        return fileobj
     
     def save_to_bytes(self) -> bytes:
         """Save document to bytes (for streaming)."""
-        buffer = BytesIO()
-        self.doc.save(buffer)
-        buffer.seek(0)
-        return buffer.getvalue()
+        # getvalue() hands over the buffer without a copy when nothing else references it
+        return self.save_to_stream(BytesIO()).getvalue()
     
     def create_blank(self):
         """Return the underlying document object."""
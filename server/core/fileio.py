@@ -0,0 +1,30 @@
+import os
+from io import BytesIO
+
+
+def open_sequential_write(filepath: str):
+    """
+    Open filepath for writing ('wb' semantics) and tell the kernel the file will be written
+    front to back, as zip-based office files are; lets it flush and evict pages early.
+    """
+    fd = os.open(os.fspath(filepath), os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o666)
+    if hasattr(os, 'posix_fadvise'):
+        try:
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_SEQUENTIAL)
+        except OSError:
+            # Advisory only; some filesystems don't support it
+            pass
+    return os.fdopen(fd, 'wb')
+
+
+def save_sequential(filepath: str, save) -> str:
+    """
+    Serialize a document with save(fileobj) in memory, then write it to filepath in one call.
+    zipfile seeks back to patch each member's local header, which flushes any file buffer;
+    in memory those seeks are free and the file gets a single sequential write.
+    """
+    buf = BytesIO()
+    save(buf)
+    with open_sequential_write(filepath) as f, buf.getbuffer() as view:
+        f.write(view)
+    return filepath
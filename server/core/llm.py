@@ -1,14 +1,218 @@
 import os
-import json
+import orjson
 import re
+import asyncio
 import logging
+import importlib.util
 from typing import Optional, Dict, Any, List
+import httpx
+from cachetools import LRUCache
 from pydantic import BaseModel
 
 # Configure logging
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
 
+# Shared keep-alive connection pool for every LLM client (default and per-request keys)
+_http_client = httpx.AsyncClient(
+    timeout=httpx.Timeout(60.0, connect=5.0),
+    limits=httpx.Limits(max_keepalive_connections=100, max_connections=200),
+    http2=importlib.util.find_spec("h2") is not None  # HTTP/2 needs the optional h2 package
+)
+
+# Max per-request API key clients kept alive
+CLIENT_CACHE_SIZE = int(os.getenv("LLM_CLIENT_CACHE_SIZE", "256"))
+
+# Concurrent slide expansions for an outlined presentation (0, the default, generates it in one call).
+# Opt-in: a deck then costs 1 + N LLM calls, all made under the request's single admission slot.
+PPT_FANOUT_CONCURRENCY = int(os.getenv("PPT_FANOUT_CONCURRENCY", "0"))
+
+_OPENROUTER_BASE_URL = "https://openrouter.ai/api/v1"
+_OPENROUTER_HOST = "openrouter.ai"
+
+# App attribution headers (read by OpenRouter) sent by every LLM client
+_DEFAULT_HEADERS = {"HTTP-Referer": "http://localhost:5173", "X-Title": "AI Office Suite"}
+
+# System prompts are module constants so every request sends a byte-identical prefix
+# (system prompt first, then context, then the user turn) that provider prompt caches can match.
+
+# System prompts for JSON structure generation, shared by direct and batch requests
+STRUCTURE_SYSTEM_PROMPTS = {
+    'word': """You are a professional document writer. Generate a structured document.
+    If context is provided, you are modifying an existing document.
+    Output a JSON object with: title, sections, style_guide.
+    Respond ONLY with valid JSON.""",
+    'excel': """You are a data analyst. Generate structured spreadsheet data.
+    If context is provided, you are modifying an existing sheet.
+    Output a JSON object with: title, headers, rows, formulas.
+    Respond ONLY with valid JSON.""",
+    'ppt': """You are a presentation designer. Generate a structured presentation.
+    If context is provided, you are modifying an existing presentation.
+    Output a JSON object with: title, subtitle, slides.
+    Respond ONLY with valid JSON.""",
+}
+
+# System prompts for streamed generation: Markdown preview followed by a <STRUCTURE> JSON block
+STREAM_SYSTEM_PROMPTS = {
+    'word': """You are a professional document writer. Your goal is to write a high-quality document.
+
+    IMPORTANT: Output in TWO parts:
+    1. First, output the document content directly in MARKDOWN format. This is for real-time preview.
+    2. Finally, output a JSON block at the very end wrapped in <STRUCTURE> tags.
+
+    JSON Structure: {
+        "title": "Document Title",
+        "sections": [{"heading": "...", "content": "...", "level": 1}],
+        "style_guide": {...}
+    }
+
+    The Markdown should be rich and detailed. The JSON must match the content.
+""",
+    'excel': """You are a data analyst.
+    1. First, output a Markdown TABLE representing the data.
+    2. Finally, output a JSON block wrapped in <STRUCTURE> tags.
+
+    JSON Structure: {
+        "title": "Sheet Name",
+        "headers": ["Col1", "Col2"],
+        "rows": [["Val1", "Val2"]],
+        "formulas": {"A1": "=SUM(...)"}
+    }
+""",
+    'ppt': """You are a presentation designer.
+    1. First, output a Markdown list of slides with their titles and main points.
+    2. Finally, output a JSON block wrapped in <STRUCTURE> tags.
+
+    JSON Structure: {
+        "title": "Presentation Title",
+        "slides": [{"type": "content", "title": "Slide Title", "content": ["point 1"]}]
+    }
+""",
+}
+
+DETECT_SYSTEM_PROMPT = """You are a document type classifier. Based on the user's request, determine the most appropriate document type.
+
+Rules:
+- "word": For text-heavy documents like reports, letters, essays, meeting notes, proposals, contracts, articles
+- "excel": For data, numbers, calculations, budgets, lists, tables, schedules, tracking, inventory
+- "ppt": For presentations, slides, pitch decks, training materials, visual storytelling
+
+Respond with ONLY a JSON object: {"type": "word"} or {"type": "excel"} or {"type": "ppt"}
+No other text."""
+
+DETECT_BATCH_SYSTEM_PROMPT = """You are a document type classifier. The user message is a JSON array of independent requests.
+For each request, determine the most appropriate document type.
+
+Rules:
+- "word": For text-heavy documents like reports, letters, essays, meeting notes, proposals, contracts, articles
+- "excel": For data, numbers, calculations, budgets, lists, tables, schedules, tracking, inventory
+- "ppt": For presentations, slides, pitch decks, training materials, visual storytelling
+
+Respond with ONLY a JSON object: {"types": [...]} with one of "word", "excel" or "ppt" per request, in order.
+No other text."""
+
+# Two-phase presentation generation: a short outline, then each slide expanded concurrently
+PPT_OUTLINE_SYSTEM_PROMPT = """You are a presentation designer. Plan a presentation.
+Output a JSON object with: title, subtitle, slides.
+slides lists the content slides (not the title slide), each as {"title": "...", "summary": "one-line description"}.
+Respond ONLY with valid JSON."""
+
+PPT_SLIDE_SYSTEM_PROMPT = """You are a presentation designer. Write one slide of a presentation.
+The user message is a JSON object with the original request, the presentation title and the planned slide.
+Output a JSON object with: title, content (a list of concise bullet points).
+Respond ONLY with valid JSON."""
+
+CHAT_SYSTEM_PROMPT = """你是一个专业的文档助手。你的任务是帮助用户创建文档（Word、Excel 或 PPT）。
+
+在开始创建文档之前，你需要：
+1. 理解用户想要什么类型的文档
+2. 了解文档的主要内容 and 结构
+3. 确认任何特殊的格式或样式要求
+
+与用户对话时：
+- 用简洁友好的方式回复
+- 如果需求不清楚，提出具体问题
+- 当你认为已经充分了解需求时，在回复末尾添加标记 [READY]
+
+回复格式（JSON）：
+{
+    "message": "你的回复内容",
+    "ready_to_generate": true/false,
+    "detected_type": "word/excel/ppt" (仅当 ready_to_generate 为 true 时),
+    "summary": "需求摘要" (仅当 ready_to_generate 为 true 时)
+}
+
+始终用中文回复，除非用户用其他语言交流。"""
+
+CHAT_STREAM_SYSTEM_PROMPT = """你是一个专业的文档助手。你的任务是帮助用户创建文档（Word、Excel 或 PPT）。
+请直接输出你的回复内容。如果你认为需求已经明确且准备好生成文档，请在回复的最末尾另起一行加上 [READY:type:summary]。
+其中 type 是 word/excel/ppt，summary 是需求简要描述。
+
+示例：
+好的，我已经了解了您的需求，将为您创建一份关于“公司年度总结”的报告。
+[READY:word:公司年度总结报告]
+
+始终用中文回复，除非用户用其他语言交流。"""
+
+
+def _system_message(client: Any, prompt: str) -> Dict[str, Any]:
+    """
+    Build the system message for a request.
+    OpenRouter forwards cache_control to providers with explicit prompt caching, so the
+    static system prefix can be served from their cache; other endpoints get a plain string.
+    """
+    if client.base_url.host == _OPENROUTER_HOST:
+        return {"role": "system", "content": _cached_text(prompt)}
+    return {"role": "system", "content": prompt}
+
+
+def _cached_text(text: str) -> List[Dict[str, Any]]:
+    """Message content as a single text part marked as a prompt cache breakpoint."""
+    return [{"type": "text", "text": text, "cache_control": {"type": "ephemeral"}}]
+
+
+def _chat_messages(client: Any, system_prompt: str, messages: List[Dict[str, str]]) -> List[Dict[str, Any]]:
+    """
+    Prepend the system prompt to a conversation.
+    On OpenRouter the turn before the newest is also a cache breakpoint, so the whole prior
+    conversation is read from the provider cache and only the new turn is prefilled.
+    """
+    full_messages = [_system_message(client, system_prompt), *messages]
+    if len(full_messages) > 2 and client.base_url.host == _OPENROUTER_HOST:
+        prior = full_messages[-2]
+        if isinstance(prior.get("content"), str):
+            full_messages[-2] = {**prior, "content": _cached_text(prior["content"])}
+    return full_messages
+
+
+async def _stream_content(client: Any, model: str, messages: List[Dict[str, Any]]):
+    """
+    Yield the content deltas of a streamed chat completion.
+    Reads the raw SSE lines and picks out each delta with orjson instead of having the SDK
+    build and validate a ChatCompletionChunk model for every token.
+    """
+    async with client.chat.completions.with_streaming_response.create(
+        model=model,
+        messages=messages,
+        stream=True
+    ) as response:
+        async for line in response.iter_lines():
+            # Skip blank separators and SSE comments (OpenRouter sends keep-alive comments)
+            if not line.startswith("data:"):
+                continue
+            data = line[5:].strip()
+            if data == "[DONE]":
+                break
+            chunk = orjson.loads(data)
+            if "error" in chunk:
+                error = chunk["error"]
+                raise Exception(error.get("message", error) if isinstance(error, dict) else error)
+            choices = chunk.get("choices")
+            if choices:
+                content = (choices[0].get("delta") or {}).get("content")
+                if content:
+                    yield content
+
 
 class DocumentSection(BaseModel):
     """A section of a document."""
@@ -50,17 +254,22 @@ class LLMService:
         self.api_key = os.getenv("OPENROUTER_API_KEY") or os.getenv("OPENAI_API_KEY")
         self.model = os.getenv("LLM_MODEL", "google/gemini-2.0-flash-001")
         self.client = None
+        # Clients for per-request API keys, keyed by (api_key, base_url)
+        self._clients = LRUCache(maxsize=CLIENT_CACHE_SIZE)
+        self._structure_generators = {
+            'word': self._generate_word_structure,
+            'excel': self._generate_excel_structure,
+            'ppt': self._generate_ppt_structure,
+        }
         
         if self.api_key:
             try:
                 from openai import AsyncOpenAI
                 self.client = AsyncOpenAI(
                     api_key=self.api_key,
-                    base_url="https://openrouter.ai/api/v1",
-                    default_headers={
-                        "HTTP-Referer": "http://localhost:5173",
-                        "X-Title": "AI Office Suite"
-                    }
+                    base_url=_OPENROUTER_BASE_URL,
+                    default_headers=_DEFAULT_HEADERS,
+                    http_client=_http_client
                 )
             except ImportError:
                 logger.error("OpenAI package not installed. Please install it using: pip install openai")
@@ -82,41 +291,65 @@ class LLMService:
         client = self._get_client(config)
         model = self._get_model(config)
         
-        system_prompt = """You are a document type classifier. Based on the user's request, determine the most appropriate document type.
-
-Rules:
-- "word": For text-heavy documents like reports, letters, essays, meeting notes, proposals, contracts, articles
-- "excel": For data, numbers, calculations, budgets, lists, tables, schedules, tracking, inventory
-- "ppt": For presentations, slides, pitch decks, training materials, visual storytelling
-
-Respond with ONLY a JSON object: {"type": "word"} or {"type": "excel"} or {"type": "ppt"}
-No other text."""
+        system_prompt = DETECT_SYSTEM_PROMPT
 
         try:
             response = await client.chat.completions.create(
                 model=model,
                 messages=[
-                    {"role": "system", "content": system_prompt},
+                    _system_message(client, system_prompt),
                     {"role": "user", "content": user_prompt}
                 ],
                 response_format={"type": "json_object"}
             )
             content = response.choices[0].message.content
-            result = json.loads(content)
+            result = orjson.loads(content)
             detected_type = result.get("type")
             
             if detected_type in ["word", "excel", "ppt"]:
                 return detected_type
             
             # If JSON parsing worked but value is unexpected, default to word but log warning
-            logger.warning(f"Unexpected document type detected: {detected_type}, defaulting to word")
+            logger.warning("Unexpected document type detected: %s, defaulting to word", detected_type)
             return "word"
             
         except Exception as e:
-            logger.error(f"Document type detection failed: {str(e)}")
+            logger.error("Document type detection failed: %s", e)
             raise Exception(f"AI Detection failed: {str(e)}. Please check your API key.")
 
     
+    async def detect_document_types(
+        self,
+        user_prompts: List[str],
+        config: Optional[Dict[str, Any]] = None
+    ) -> List[str]:
+        """
+        Detect the document type of several independent prompts with a single LLM call.
+        
+        Returns one of 'word', 'excel' or 'ppt' per prompt, in order.
+        """
+        client = self._get_client(config)
+        model = self._get_model(config)
+        
+        try:
+            response = await client.chat.completions.create(
+                model=model,
+                messages=[
+                    _system_message(client, DETECT_BATCH_SYSTEM_PROMPT),
+                    {"role": "user", "content": orjson.dumps(user_prompts).decode()}
+                ],
+                response_format={"type": "json_object"}
+            )
+            detected_types = orjson.loads(response.choices[0].message.content).get("types")
+        except Exception as e:
+            logger.error("Batched document type detection failed: %s", e)
+            raise Exception(f"AI Detection failed: {str(e)}. Please check your API key.")
+        
+        if not isinstance(detected_types, list) or len(detected_types) != len(user_prompts):
+            raise ValueError(f"Expected {len(user_prompts)} document types, got: {detected_types}")
+        
+        return [t if t in ("word", "excel", "ppt") else "word" for t in detected_types]
+
     async def generate_document_structure(
         self,
         user_prompt: str,
@@ -128,17 +361,16 @@ No other text."""
         """
         Generate structured document content from natural language.
         """
-        client = await self._get_client(config)
+        generate = self._structure_generators.get(doc_type)
+        if generate is None:
+            raise ValueError(f"Unknown document type: {doc_type}")
+        
+        client = self._get_client(config)
         model = self._get_model(config)
         
-        if doc_type == 'word':
-            return await self._generate_word_structure(user_prompt, style_guide, client, model, context)
-        elif doc_type == 'excel':
-            return await self._generate_excel_structure(user_prompt, client, model, context)
-        elif doc_type == 'ppt':
-            return await self._generate_ppt_structure(user_prompt, client, model, context)
-        else:
-            raise ValueError(f"Unknown document type: {doc_type}")
+        # Only the Word generator takes a style guide
+        extra = {"style_guide": style_guide} if doc_type == 'word' else {}
+        return await generate(user_prompt, client=client, model=model, context=context, **extra)
 
     async def generate_document_structure_stream(
         self,
@@ -152,67 +384,24 @@ No other text."""
         Stream Markdown-formatted content for real-time preview, 
         while eventually yielding the final JSON structure for the document engine.
         """
-        client = await self._get_client(config)
+        client = self._get_client(config)
         model = self._get_model(config)
 
         # Decide which prompt to use based on type
-        if doc_type == 'word':
-            system_prompt = """You are a professional document writer. Your goal is to write a high-quality document.
-            
-            IMPORTANT: Output in TWO parts:
-            1. First, output the document content directly in MARKDOWN format. This is for real-time preview.
-            2. Finally, output a JSON block at the very end wrapped in <STRUCTURE> tags.
-            
-            JSON Structure: {
-                "title": "Document Title",
-                "sections": [{"heading": "...", "content": "...", "level": 1}],
-                "style_guide": {...}
-            }
-            
-            The Markdown should be rich and detailed. The JSON must match the content.
-            """
-        elif doc_type == 'excel':
-            system_prompt = """You are a data analyst. 
-            1. First, output a Markdown TABLE representing the data.
-            2. Finally, output a JSON block wrapped in <STRUCTURE> tags.
-            
-            JSON Structure: {
-                "title": "Sheet Name",
-                "headers": ["Col1", "Col2"],
-                "rows": [["Val1", "Val2"]],
-                "formulas": {"A1": "=SUM(...)"}
-            }
-            """
-        else: # PPT
-            system_prompt = """You are a presentation designer.
-            1. First, output a Markdown list of slides with their titles and main points.
-            2. Finally, output a JSON block wrapped in <STRUCTURE> tags.
-            
-            JSON Structure: {
-                "title": "Presentation Title",
-                "slides": [{"type": "content", "title": "Slide Title", "content": ["point 1"]}]
-            }
-            """
+        system_prompt = STREAM_SYSTEM_PROMPTS.get(doc_type, STREAM_SYSTEM_PROMPTS['ppt'])
 
-        full_messages = [{"role": "system", "content": system_prompt}]
-        if context:
-            full_messages.extend(context)
-        full_messages.append({"role": "user", "content": user_prompt})
+        full_messages = [
+            _system_message(client, system_prompt),
+            *(context or ()),
+            {"role": "user", "content": user_prompt}
+        ]
 
         try:
-            response = await client.chat.completions.create(
-                model=model,
-                messages=full_messages,
-                stream=True
-            )
-            
-            async for chunk in response:
-                content = chunk.choices[0].delta.content
-                if content:
-                    yield content
+            async for content in _stream_content(client, model, full_messages):
+                yield content
                     
         except Exception as e:
-            logger.error(f"Structure stream failed: {str(e)}")
+            logger.error("Structure stream failed: %s", e)
             yield f"Error: {str(e)}"
     
     async def _generate_word_structure(
@@ -225,73 +414,117 @@ No other text."""
     ) -> Dict[str, Any]:
         """Generate Word document structure."""
         
-        system_prompt = """You are a professional document writer. Generate a structured document.
-        If context is provided, you are modifying an existing document.
-        Output a JSON object with: title, sections, style_guide.
-        Respond ONLY with valid JSON."""
+        system_prompt = STRUCTURE_SYSTEM_PROMPTS['word']
 
         try:
-            messages = [{"role": "system", "content": system_prompt}]
-            if context: messages.extend(context)
-            messages.append({"role": "user", "content": user_prompt})
+            messages = [
+                _system_message(client, system_prompt),
+                *(context or ()),
+                {"role": "user", "content": user_prompt}
+            ]
             
             response = await client.chat.completions.create(
                 model=model,
                 messages=messages,
                 response_format={"type": "json_object"}
             )
-            return json.loads(response.choices[0].message.content)
+            return orjson.loads(response.choices[0].message.content)
         except Exception as e:
-            logger.error(f"LLM generation failed: {str(e)}")
+            logger.error("LLM generation failed: %s", e)
             raise Exception(f"Failed to generate Word document: {str(e)}")
 
     
     async def _generate_excel_structure(self, user_prompt: str, client: Any = None, model: str = None, context: Optional[List[Dict[str, str]]] = None) -> Dict[str, Any]:
         """Generate Excel spreadsheet structure."""
         
-        system_prompt = """You are a data analyst. Generate structured spreadsheet data.
-        If context is provided, you are modifying an existing sheet.
-        Output a JSON object with: title, headers, rows, formulas.
-        Respond ONLY with valid JSON."""
+        system_prompt = STRUCTURE_SYSTEM_PROMPTS['excel']
 
         try:
-            messages = [{"role": "system", "content": system_prompt}]
-            if context: messages.extend(context)
-            messages.append({"role": "user", "content": user_prompt})
+            messages = [
+                _system_message(client, system_prompt),
+                *(context or ()),
+                {"role": "user", "content": user_prompt}
+            ]
 
             response = await client.chat.completions.create(
                 model=model,
                 messages=messages,
                 response_format={"type": "json_object"}
             )
-            return json.loads(response.choices[0].message.content)
+            return orjson.loads(response.choices[0].message.content)
         except Exception as e:
-            logger.error(f"LLM generation failed: {str(e)}")
+            logger.error("LLM generation failed: %s", e)
             raise Exception(f"Failed to generate Excel spreadsheet: {str(e)}")
 
     
     async def _generate_ppt_structure(self, user_prompt: str, client: Any = None, model: str = None, context: Optional[List[Dict[str, str]]] = None) -> Dict[str, Any]:
         """Generate PowerPoint presentation structure."""
         
-        system_prompt = """You are a presentation designer. Generate a structured presentation.
-        If context is provided, you are modifying an existing presentation.
-        Output a JSON object with: title, subtitle, slides.
-        Respond ONLY with valid JSON."""
+        # Modifications need the whole existing presentation in one call
+        if not context and PPT_FANOUT_CONCURRENCY > 0:
+            return await self._generate_ppt_outlined(user_prompt, client, model)
+        
+        system_prompt = STRUCTURE_SYSTEM_PROMPTS['ppt']
 
         try:
-            messages = [{"role": "system", "content": system_prompt}]
-            if context: messages.extend(context)
-            messages.append({"role": "user", "content": user_prompt})
+            messages = [
+                _system_message(client, system_prompt),
+                *(context or ()),
+                {"role": "user", "content": user_prompt}
+            ]
 
             response = await client.chat.completions.create(
                 model=model,
                 messages=messages,
                 response_format={"type": "json_object"}
             )
-            return json.loads(response.choices[0].message.content)
+            return orjson.loads(response.choices[0].message.content)
+        except Exception as e:
+            logger.error("LLM generation failed: %s", e)
+            raise Exception(f"Failed to generate Presentation: {str(e)}")
+
+    async def _generate_ppt_outlined(self, user_prompt: str, client: Any, model: str) -> Dict[str, Any]:
+        """
+        Generate a presentation as an outline followed by concurrent per-slide calls.
+        Latency follows the slowest slide instead of the decode time of the whole deck.
+        """
+        semaphore = asyncio.Semaphore(PPT_FANOUT_CONCURRENCY)
+        
+        async def expand(title: str, planned: Any) -> Dict[str, Any]:
+            if not isinstance(planned, dict):
+                planned = {"title": str(planned)}
+            request = {"request": user_prompt, "presentation": title, "slide": planned}
+            async with semaphore:
+                slide = await self._complete_json(client, model, PPT_SLIDE_SYSTEM_PROMPT, orjson.dumps(request).decode())
+            return {"type": "content", "title": slide.get("title", planned.get("title")), "content": slide.get("content", [])}
+        
+        try:
+            outline = await self._complete_json(client, model, PPT_OUTLINE_SYSTEM_PROMPT, user_prompt)
+            title = outline.get("title", "Presentation")
+            slides = await asyncio.gather(*(expand(title, planned) for planned in outline.get("slides", [])))
         except Exception as e:
-            logger.error(f"LLM generation failed: {str(e)}")
+            logger.error("LLM generation failed: %s", e)
             raise Exception(f"Failed to generate Presentation: {str(e)}")
+        
+        title_slide = {"type": "title", "title": title}
+        structure = {"title": title}
+        if outline.get("subtitle"):
+            structure["subtitle"] = outline["subtitle"]
+            title_slide["content"] = [outline["subtitle"]]
+        structure["slides"] = [title_slide, *slides]
+        return structure
+
+    async def _complete_json(self, client: Any, model: str, system_prompt: str, user_content: str) -> Dict[str, Any]:
+        """Single JSON-mode completion for a system prompt and one user message."""
+        response = await client.chat.completions.create(
+            model=model,
+            messages=[
+                _system_message(client, system_prompt),
+                {"role": "user", "content": user_content}
+            ],
+            response_format={"type": "json_object"}
+        )
+        return orjson.loads(response.choices[0].message.content)
 
     async def chat(
         self,
@@ -307,33 +540,13 @@ No other text."""
             - detected_type: Detected document type if ready
             - summary: Summary of requirements if ready
         """
-        client = await self._get_client(config)
+        client = self._get_client(config)
         model = self._get_model(config)
         
-        system_prompt = """你是一个专业的文档助手。你的任务是帮助用户创建文档（Word、Excel 或 PPT）。
-
-在开始创建文档之前，你需要：
-1. 理解用户想要什么类型的文档
-2. 了解文档的主要内容 and 结构
-3. 确认任何特殊的格式或样式要求
-
-与用户对话时：
-- 用简洁友好的方式回复
-- 如果需求不清楚，提出具体问题
-- 当你认为已经充分了解需求时，在回复末尾添加标记 [READY]
-
-回复格式（JSON）：
-{
-    "message": "你的回复内容",
-    "ready_to_generate": true/false,
-    "detected_type": "word/excel/ppt" (仅当 ready_to_generate 为 true 时),
-    "summary": "需求摘要" (仅当 ready_to_generate 为 true 时)
-}
-
-始终用中文回复，除非用户用其他语言交流。"""
+        system_prompt = CHAT_SYSTEM_PROMPT
 
         try:
-            full_messages = [{"role": "system", "content": system_prompt}] + messages
+            full_messages = _chat_messages(client, system_prompt, messages)
             
             response = await client.chat.completions.create(
                 model=model,
@@ -341,7 +554,7 @@ No other text."""
                 response_format={"type": "json_object"}
             )
             
-            result = json.loads(response.choices[0].message.content)
+            result = orjson.loads(response.choices[0].message.content)
             return {
                 "message": result.get("message", ""),
                 "ready_to_generate": result.get("ready_to_generate", False),
@@ -350,7 +563,7 @@ No other text."""
             }
             
         except Exception as e:
-            logger.error(f"Chat failed: {str(e)}")
+            logger.error("Chat failed: %s", e)
             raise Exception(f"Chat failed: {str(e)}")
 
     async def chat_stream(
@@ -361,53 +574,127 @@ No other text."""
         """
         Streamed conversation with the AI.
         """
-        client = await self._get_client(config)
+        client = self._get_client(config)
         model = self._get_model(config)
         
-        system_prompt = """你是一个专业的文档助手。你的任务是帮助用户创建文档（Word、Excel 或 PPT）。
-请直接输出你的回复内容。如果你认为需求已经明确且准备好生成文档，请在回复的最末尾另起一行加上 [READY:type:summary]。
-其中 type 是 word/excel/ppt，summary 是需求简要描述。
-
-示例：
-好的，我已经了解了您的需求，将为您创建一份关于“公司年度总结”的报告。
-[READY:word:公司年度总结报告]
-
-始终用中文回复，除非用户用其他语言交流。"""
+        system_prompt = CHAT_STREAM_SYSTEM_PROMPT
 
         try:
-            full_messages = [{"role": "system", "content": system_prompt}] + messages
-            
-            response = await client.chat.completions.create(
-                model=model,
-                messages=full_messages,
-                stream=True
-            )
+            full_messages = _chat_messages(client, system_prompt, messages)
             
-            async for chunk in response:
-                if chunk.choices[0].delta.content:
-                    yield chunk.choices[0].delta.content
+            async for content in _stream_content(client, model, full_messages):
+                yield content
                     
         except Exception as e:
-            logger.error(f"Chat stream failed: {str(e)}")
+            logger.error("Chat stream failed: %s", e)
             yield f"Error: {str(e)}"
 
 
 
-    async def _get_client(self, config: Optional[Dict[str, Any]] = None):
+    async def submit_structure_batch(
+        self,
+        items: List[Dict[str, str]],
+        config: Optional[Dict[str, Any]] = None
+    ):
+        """
+        Submit structure generation for many documents as one provider Batch API job.
+        
+        Args:
+            items: Dicts with custom_id, doc_type and prompt
+        
+        Returns the provider's batch object. Batches cost less but complete asynchronously
+        (within 24h); the provider must support the OpenAI Batch API.
+        """
+        client = self._get_client(config)
+        model = self._get_model(config)
+        
+        lines = []
+        for item in items:
+            lines.append(orjson.dumps({
+                "custom_id": item["custom_id"],
+                "method": "POST",
+                "url": "/v1/chat/completions",
+                "body": {
+                    "model": model,
+                    "messages": [
+                        {"role": "system", "content": STRUCTURE_SYSTEM_PROMPTS[item["doc_type"]]},
+                        {"role": "user", "content": item["prompt"]}
+                    ],
+                    "response_format": {"type": "json_object"}
+                }
+            }))
+        
+        try:
+            batch_file = await client.files.create(
+                file=("batch.jsonl", b"\n".join(lines)),
+                purpose="batch"
+            )
+            return await client.batches.create(
+                input_file_id=batch_file.id,
+                endpoint="/v1/chat/completions",
+                completion_window="24h"
+            )
+        except Exception as e:
+            logger.error("Batch submission failed: %s", e)
+            raise Exception(f"Batch submission failed: {str(e)}")
+
+    async def get_structure_batch(self, batch_id: str, config: Optional[Dict[str, Any]] = None):
+        """Retrieve the current state of a structure batch."""
+        client = self._get_client(config)
+        return await client.batches.retrieve(batch_id)
+
+    async def get_structure_batch_results(
+        self,
+        batch,
+        config: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        Download a completed batch's output.
+        
+        Returns: {custom_id: {"structure": {...}} or {"error": "..."}}
+        """
+        client = self._get_client(config)
+        results = {}
+        
+        for file_id in (batch.output_file_id, batch.error_file_id):
+            if not file_id:
+                continue
+            content = await client.files.content(file_id)
+            for line in content.content.splitlines():
+                if not line.strip():
+                    continue
+                record = orjson.loads(line)
+                custom_id = record.get("custom_id")
+                response = record.get("response") or {}
+                try:
+                    if record.get("error") or response.get("status_code") != 200:
+                        raise ValueError(record.get("error") or response.get("body"))
+                    message = response["body"]["choices"][0]["message"]["content"]
+                    results[custom_id] = {"structure": orjson.loads(message)}
+                except Exception as e:
+                    results[custom_id] = {"error": f"Generation failed: {str(e)}"}
+        
+        return results
+
+    def _get_client(self, config: Optional[Dict[str, Any]] = None):
         """Helper to get the appropriate client."""
         if config:
             api_key = config.get("api_key")
             if api_key:
+                key = (api_key, config.get("base_url") or _OPENROUTER_BASE_URL)
+                client = self._clients.get(key)
+                if client is not None:
+                    return client
                 try:
                     from openai import AsyncOpenAI
-                    return AsyncOpenAI(
-                        api_key=api_key,
-                        base_url=config.get("base_url") or "https://openrouter.ai/api/v1",
-                        default_headers={
-                            "HTTP-Referer": "http://localhost:5173",
-                            "X-Title": "AI Office Suite"
-                        }
+                    client = AsyncOpenAI(
+                        api_key=key[0],
+                        base_url=key[1],
+                        default_headers=_DEFAULT_HEADERS,
+                        http_client=_http_client
                     )
+                    self._clients[key] = client
+                    return client
                 except ImportError:
                     pass
         
@@ -421,6 +708,10 @@ No other text."""
             return config.get("model")
         return self.model
 
+    async def aclose(self):
+        """Close the shared HTTP connection pool."""
+        await _http_client.aclose()
+
 # Global instance
 llm_service = LLMService()
 
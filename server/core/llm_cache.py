@@ -0,0 +1,151 @@
+import os
+import time
+import asyncio
+import hashlib
+import logging
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+import orjson
+from cachetools import TTLCache
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TTL = int(os.getenv("LLM_CACHE_TTL", "600"))
+MAX_ENTRIES = int(os.getenv("LLM_CACHE_SIZE", "512"))
+
+
+def make_key(namespace: str, config: Optional[Dict[str, Any]] = None, **parts: Any) -> str:
+    """
+    Build a stable cache key from request parts.
+    The API key is never part of the key (nor stored anywhere in the cache).
+    """
+    parts["config"] = {k: v for k, v in (config or {}).items() if k != "api_key" and v is not None}
+    payload = orjson.dumps(parts, option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS, default=str)
+    return f"{namespace}:{hashlib.sha256(payload).hexdigest()}"
+
+
+class MemoryBackend:
+    """In-process TTL cache. Values are stored with their own expiry so per-call TTLs are honoured."""
+
+    def __init__(self, maxsize: int = MAX_ENTRIES, ttl: int = DEFAULT_TTL):
+        self._cache = TTLCache(maxsize=maxsize, ttl=max(ttl, 1))
+        self._lock = asyncio.Lock()
+
+    async def get(self, key: str) -> Optional[Any]:
+        async with self._lock:
+            entry = self._cache.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            return None
+        return value
+
+    async def set(self, key: str, value: Any, ttl: int):
+        async with self._lock:
+            self._cache[key] = (time.monotonic() + ttl, value)
+
+
+class RedisBackend:
+    """Shared cache across worker processes. Values must be JSON-serializable."""
+
+    def __init__(self, url: str):
+        from redis import asyncio as aioredis
+        self._redis = aioredis.from_url(url)
+
+    async def get(self, key: str) -> Optional[Any]:
+        raw = await self._redis.get(key)
+        return orjson.loads(raw) if raw is not None else None
+
+    async def set(self, key: str, value: Any, ttl: int):
+        await self._redis.set(key, orjson.dumps(value), ex=ttl)
+
+
+class LLMCache:
+    """
+    Response cache for LLM-backed endpoints.
+    Identical requests made while a computation is in flight share its result.
+    """
+
+    def __init__(self, backend=None, ttl: int = DEFAULT_TTL):
+        self.backend = backend
+        self.ttl = ttl
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+    @property
+    def enabled(self) -> bool:
+        return self.backend is not None and self.ttl > 0
+
+    async def get(self, key: str) -> Optional[Any]:
+        if not self.enabled:
+            return None
+        try:
+            return await self.backend.get(key)
+        except Exception as e:
+            logger.warning(f"LLM cache read failed: {e}")
+            return None
+
+    async def set(self, key: str, value: Any, ttl: Optional[int] = None):
+        if not self.enabled:
+            return
+        try:
+            await self.backend.set(key, value, ttl or self.ttl)
+        except Exception as e:
+            logger.warning(f"LLM cache write failed: {e}")
+
+    async def get_or_compute(
+        self,
+        key: str,
+        coro_factory: Callable[[], Awaitable[Any]],
+        ttl: Optional[int] = None
+    ) -> Any:
+        """Return the cached value for key, or await coro_factory() and cache its result."""
+        if not self.enabled:
+            return await coro_factory()
+
+        cached = await self.get(key)
+        if cached is not None:
+            return cached
+
+        pending = self._inflight.get(key)
+        if pending is not None:
+            try:
+                return await asyncio.shield(pending)
+            except asyncio.CancelledError:
+                if not pending.cancelled():
+                    raise
+                # The request computing this value was cancelled (e.g. timed out); compute it ourselves
+                return await coro_factory()
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            value = await coro_factory()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Mark retrieved so an unobserved failure doesn't log a warning
+            future.exception()
+            raise
+        else:
+            future.set_result(value)
+            await self.set(key, value, ttl)
+            return value
+        finally:
+            self._inflight.pop(key, None)
+
+
+def _create_backend():
+    redis_url = os.getenv("REDIS_URL")
+    if redis_url:
+        try:
+            return RedisBackend(redis_url)
+        except ImportError:
+            logger.warning("REDIS_URL is set but the redis package is not installed; using in-memory LLM cache")
+    return MemoryBackend()
+
+
+# Global instance
+llm_cache = LLMCache(_create_backend())
@@ -0,0 +1,116 @@
+import os
+import time
+import asyncio
+import logging
+import threading
+from typing import Any, Awaitable, Callable, List, Optional, Tuple
+
+from core.llm_cache import DEFAULT_TTL, MAX_ENTRIES
+
+try:
+    import numpy as np
+    from sentence_transformers import SentenceTransformer
+except ImportError:
+    SentenceTransformer = None
+
+logger = logging.getLogger(__name__)
+
+SEMANTIC_CACHE_MODEL = os.getenv("SEMANTIC_CACHE_MODEL")
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.92"))
+
+
+class SemanticCache:
+    """
+    Near-duplicate prompt cache for classification and structure requests.
+    A prompt whose embedding is within the cosine-similarity threshold of a recent prompt
+    in the same scope reuses that prompt's result. Never use it for conversational turns.
+    """
+
+    def __init__(
+        self,
+        model_name: Optional[str],
+        threshold: float = SEMANTIC_CACHE_THRESHOLD,
+        maxsize: int = MAX_ENTRIES,
+        ttl: int = DEFAULT_TTL
+    ):
+        self.model_name = model_name
+        self.threshold = threshold
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._model = None
+        self._model_lock = threading.Lock()
+        # Ring buffer of normalized embeddings; row i belongs to _entries[i]
+        self._vectors = None
+        self._entries: List[Tuple[str, float, Any]] = []
+        self._next = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.model_name is not None and SentenceTransformer is not None and self.ttl > 0
+
+    def _embed(self, prompt: str):
+        with self._model_lock:
+            if self._model is None:
+                self._model = SentenceTransformer(self.model_name)
+        return self._model.encode(prompt, normalize_embeddings=True).astype(np.float32)
+
+    def _search(self, scope: str, vector) -> Optional[Any]:
+        if not self._entries:
+            return None
+        # Flat inner-product search; embeddings are normalized so this is cosine similarity
+        scores = self._vectors[:len(self._entries)] @ vector
+        now = time.monotonic()
+        for i in np.argsort(scores)[::-1]:
+            if scores[i] < self.threshold:
+                break
+            entry_scope, expires_at, value = self._entries[i]
+            if entry_scope == scope and expires_at >= now:
+                return value
+        return None
+
+    def _store(self, scope: str, vector, value: Any):
+        if self._vectors is None:
+            self._vectors = np.empty((self.maxsize, vector.shape[0]), dtype=np.float32)
+        entry = (scope, time.monotonic() + self.ttl, value)
+        if len(self._entries) < self.maxsize:
+            self._entries.append(entry)
+            i = len(self._entries) - 1
+        else:
+            i = self._next
+            self._entries[i] = entry
+            self._next = (i + 1) % self.maxsize
+        self._vectors[i] = vector
+
+    async def get_or_compute(
+        self,
+        scope: str,
+        prompt: str,
+        coro_factory: Callable[[], Awaitable[Any]]
+    ) -> Any:
+        """
+        Return the result cached for a similar prompt in scope, or await coro_factory() and cache it.
+        scope must capture every input other than the prompt (see make_key).
+        """
+        if not self.enabled:
+            return await coro_factory()
+
+        try:
+            vector = await asyncio.to_thread(self._embed, prompt)
+        except Exception as e:
+            logger.warning(f"Semantic cache embedding failed: {e}")
+            return await coro_factory()
+
+        cached = self._search(scope, vector)
+        if cached is not None:
+            return cached
+
+        value = await coro_factory()
+        self._store(scope, vector, value)
+        return value
+
+
+if SEMANTIC_CACHE_MODEL and SentenceTransformer is None:
+    logger.warning("SEMANTIC_CACHE_MODEL is set but sentence-transformers is not installed; semantic cache disabled")
+
+# Global instance
+semantic_cache = SemanticCache(SEMANTIC_CACHE_MODEL)
@@ -0,0 +1,80 @@
+from typing import Any, List, Tuple
+
+import ijson
+
+_OPEN_TAG = "<STRUCTURE>"
+
+# Parser states
+_BEFORE, _SEEKING, _PARSING, _DONE = range(4)
+
+
+class StructureStreamParser:
+    """
+    Incrementally parses the <STRUCTURE> JSON block of a generation stream.
+    feed() takes the raw text chunks and returns every scalar completed so far as (path, value),
+    e.g. ("sections.0.heading", "Overview"), so clients can render before the stream ends.
+    Parsing is best-effort: malformed JSON just stops further results.
+    """
+
+    def __init__(self):
+        self._state = _BEFORE
+        self._pending = ""  # Tail held back in case the opening tag straddles chunks
+        self._events = ijson.sendable_list()
+        self._coro = ijson.parse_coro(self._events, use_float=True)
+        # One [key, index] per open container; index counts array items
+        self._stack: List[list] = []
+
+    def feed(self, chunk: str) -> List[Tuple[str, Any]]:
+        if self._state == _DONE:
+            return []
+
+        if self._state == _BEFORE:
+            text = self._pending + chunk
+            start = text.find(_OPEN_TAG)
+            if start == -1:
+                self._pending = text[-(len(_OPEN_TAG) - 1):]
+                return []
+            self._pending = ""
+            self._state = _SEEKING
+            chunk = text[start + len(_OPEN_TAG):]
+
+        if self._state == _SEEKING:
+            # Skip Markdown code fences and whitespace before the JSON object
+            start = chunk.find("{")
+            if start == -1:
+                return []
+            self._state = _PARSING
+            chunk = chunk[start:]
+
+        try:
+            self._coro.send(chunk.encode("utf-8"))
+        except ijson.JSONError:
+            # Trailing text after the object (e.g. a closing fence) or malformed JSON
+            self._state = _DONE
+        results = self._collect()
+        del self._events[:]
+        return results
+
+    def _collect(self) -> List[Tuple[str, Any]]:
+        results = []
+        stack = self._stack
+        for _, event, value in self._events:
+            if event == "map_key":
+                stack[-1][0] = value
+                continue
+            if event in ("end_map", "end_array"):
+                stack.pop()
+                if not stack:
+                    self._state = _DONE
+                    break
+                continue
+            if stack and stack[-1][1] is not None:
+                stack[-1][1] += 1
+                stack[-1][0] = stack[-1][1]
+            if event == "start_map":
+                stack.append([None, None])
+            elif event == "start_array":
+                stack.append([None, -1])
+            else:
+                results.append((".".join(str(key) for key, _ in stack), value))
+        return results
@@ -0,0 +1,67 @@
+import os
+import re
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Off by default: templated structures are generic, so enable only where that is acceptable
+TEMPLATE_FAST_PATH = os.getenv("TEMPLATE_FAST_PATH", "").lower() in ("1", "true", "yes")
+
+_VERB = r"^\s*(?:please\s+)?(?:create|make|write|draft|generate|prepare)\s+(?:an?\s+|the\s+)?"
+
+_AGENDA_RE = re.compile(_VERB + r"meeting agenda for (?P<subject>.+?)[.!]?\s*$", re.I)
+_BUDGET_RE = re.compile(
+    _VERB + r"budget for (?P<subject>.+?)(?: with (?P<items>\d+) (?:items|lines|rows))?[.!]?\s*$", re.I
+)
+
+_MAX_BUDGET_ITEMS = 50
+
+
+def _agenda(match: re.Match) -> Dict[str, Any]:
+    subject = match.group("subject")
+    return {
+        "title": f"Meeting Agenda: {subject}",
+        "sections": [
+            {"heading": "Welcome and Introductions", "level": 2,
+             "content": f"Opening remarks and introduction of attendees for {subject}."},
+            {"heading": "Objectives", "level": 2,
+             "content": f"Review the goals and expected outcomes of {subject}."},
+            {"heading": "Discussion", "level": 2,
+             "content": "Walk through the main topics, open questions and risks."},
+            {"heading": "Action Items", "level": 2,
+             "content": "Agree on owners and deadlines for each follow-up task."},
+            {"heading": "Next Steps", "level": 2,
+             "content": "Confirm the date of the next meeting and close."},
+        ],
+    }
+
+
+def _budget(match: re.Match) -> Dict[str, Any]:
+    subject = match.group("subject")
+    count = min(int(match.group("items") or 5), _MAX_BUDGET_ITEMS) or 1
+    rows: List[list] = [[f"Item {i}", "", 0] for i in range(1, count + 1)]
+    total_row = count + 2  # Row 1 holds the headers
+    rows.append(["Total", "", None])
+    return {
+        "title": f"{subject} Budget",  # Also the sheet name, which cannot contain ":"
+        "headers": ["Item", "Category", "Amount"],
+        "rows": rows,
+        "formulas": {f"C{total_row}": f"=SUM(C2:C{total_row - 1})"},
+    }
+
+
+# (doc_type, pattern, builder); the first pattern that matches the whole prompt wins
+_TEMPLATES: List[Tuple[str, re.Pattern, Callable[[re.Match], Dict[str, Any]]]] = [
+    ("word", _AGENDA_RE, _agenda),
+    ("excel", _BUDGET_RE, _budget),
+]
+
+
+def try_template(prompt: str, doc_type: str) -> Optional[Dict[str, Any]]:
+    """Structure for a prompt that matches a known template, or None to ask the LLM."""
+    if not TEMPLATE_FAST_PATH:
+        return None
+    for template_type, pattern, build in _TEMPLATES:
+        if template_type == doc_type:
+            match = pattern.match(prompt)
+            if match:
+                return build(match)
+    return None
@@ -1,11 +1,18 @@
 import os
-import uuid
+import re
+import secrets
+import asyncio
 import logging
 from abc import ABC, abstractmethod
-from typing import Dict, Any, Optional, List
-from pydantic import BaseModel
+from dataclasses import dataclass
+from typing import Callable, Dict, Any, Optional, List
+from openpyxl.utils import column_index_from_string
 
 from core.llm import llm_service
+from core.llm_cache import llm_cache, make_key
+from core.semantic_cache import semantic_cache
+from core.artifacts import artifact_store
+from core.templates import try_template
 from core.engine_word import WordEngine
 from core.engine_excel import ExcelEngine
 from core.engine_ppt import PPTEngine
@@ -15,9 +22,35 @@ logger = logging.getLogger(__name__)
 # Ensure output directory exists (shared constant)
 OUTPUT_DIR = os.path.join(os.path.dirname(__file__), '..', 'output')
 os.makedirs(OUTPUT_DIR, exist_ok=True)
-
-class ToolResult(BaseModel):
-    """Standardized result from a tool execution."""
+_OUTPUT_PREFIX = OUTPUT_DIR + os.sep
+
+# Max documents built and saved at once; the LLM calls before this are bounded by admission
+DOCGEN_CONCURRENCY = int(os.getenv("DOCGEN_CONCURRENCY", str(min(os.cpu_count() or 1, 8))))
+_build_slots = asyncio.Semaphore(DOCGEN_CONCURRENCY)
+
+# A1-style cell reference used as a key in the LLM's 'formulas' map
+_CELL_REF = re.compile(r'([A-Z]+)(\d+)')
+
+async def _generate_structure(prompt: str, doc_type: str, api_config: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Generate a document structure, reusing the cached one for an identical or similar prompt, type and model."""
+    structure = try_template(prompt, doc_type)
+    if structure is not None:
+        return structure
+    async def compute_similar():
+        # A near-duplicate prompt for the same type and model reuses that prompt's structure
+        return await semantic_cache.get_or_compute(
+            make_key("structure", api_config, doc_type=doc_type),
+            prompt,
+            lambda: llm_service.generate_document_structure(user_prompt=prompt, doc_type=doc_type, config=api_config)
+        )
+    
+    return await llm_cache.get_or_compute(
+        make_key("structure", api_config, doc_type=doc_type, prompt=prompt), compute_similar
+    )
+
+@dataclass(slots=True)
+class ToolResult:
+    """Standardized result from a tool execution (internal only, so not validated)."""
     success: bool
     data: Optional[Dict[str, Any]] = None
     message: Optional[str] = None
@@ -33,226 +66,170 @@ class BaseTool(ABC):
     async def run(self, *args, **kwargs) -> ToolResult:
         pass
 
-class WordGenerationTool(BaseTool):
-    """Tool for generating Word documents."""
-    name = "generate_word_document"
-    description = "Generates a Word document based on a user prompt and optional style guide."
+def _save(engine, filepath: str) -> str:
+    """Save the engine's file to filepath, or keep it in memory under the same name if enabled."""
+    if artifact_store.enabled:
+        artifact_store.put(os.path.basename(filepath), engine.save_to_bytes())
+        return filepath
+    return engine.save(filepath)
+
+def _build_word(doc_id: str, structure: dict, fallback_title: str) -> str:
+    engine = WordEngine()
+    
+    # Apply style guide
+    style = structure.get('style_guide') or {}
+    if style:
+        margin = style.get('margin', 2.54)
+        engine.set_page_margins(top=margin, bottom=margin, left=margin, right=margin)
+    else:
+        engine.set_page_margins(top=2.54, bottom=2.54, left=3.18, right=3.18)
+    
+    # Content
+    title = structure.get('title', fallback_title)
+    engine.add_heading(title, level=1)
+    
+    # Body text style is the same for every section
+    font_name = style.get('font_name', 'Arial')
+    font_size = style.get('font_size', 12)
+    line_spacing = style.get('line_spacing', 1.5)
+    
+    for section in structure.get('sections', []):
+        if section.get('heading'):
+            engine.add_heading(section['heading'], level=section.get('level', 2))
+        
+        engine.add_paragraph(
+            section.get('content', ''),
+            font_name=font_name,
+            font_size=font_size,
+            line_spacing=line_spacing,
+            line_spacing_rule='multiple',
+            space_after=12
+        )
+    
+    filepath = f"{_OUTPUT_PREFIX}{doc_id}.docx"
+    return _save(engine, filepath)
+
+def _build_excel(doc_id: str, structure: dict, fallback_title: str) -> str:
+    engine = ExcelEngine()
+    
+    title = structure.get('title', fallback_title)
+    engine.set_sheet_name(title[:31])
+    
+    headers = structure.get('headers', [])
+    rows = structure.get('rows', [])
+    if headers:
+        engine.set_data_range([headers] + rows, header=True)
+    else:
+        engine.set_data_range(rows, start_row=2, header=False)
+    
+    formulas = []
+    for cell_ref, formula in structure.get('formulas', {}).items():
+        match = _CELL_REF.match(cell_ref.upper())
+        if match:
+            formulas.append((int(match.group(2)), column_index_from_string(match.group(1)), formula))
+    engine.set_formulas_bulk(formulas)
+    
+    engine.auto_fit_columns()
+    if headers and rows:
+        engine.add_borders(1, 1, len(rows) + 1, len(headers))
+    
+    filepath = f"{_OUTPUT_PREFIX}{doc_id}.xlsx"
+    return _save(engine, filepath)
+
+def _build_ppt(doc_id: str, structure: dict, fallback_title: str) -> str:
+    engine = PPTEngine()
+    
+    title = structure.get('title', fallback_title)
+    subtitle = structure.get('subtitle', 'Generated by AI Office Suite')
+    
+    engine.add_title_slide(title, subtitle)
+    
+    for slide_data in structure.get('slides', [])[1:]:
+        engine.add_slide_from_spec(slide_data)
+    
+    filepath = f"{_OUTPUT_PREFIX}{doc_id}.pptx"
+    return _save(engine, filepath)
+
+class DocumentGenerationTool(BaseTool):
+    """
+    Tool for generating one type of document: the LLM writes a structure, builder renders it to a file.
+    builder(doc_id, structure, fallback_title) returns the path of the saved file.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        description: str,
+        doc_type: str,
+        label: str,
+        default_title: str,
+        builder: Callable[[str, dict, str], str]
+    ):
+        self.name = name
+        self.description = description
+        self.doc_type = doc_type
+        self.label = label
+        self.default_title = default_title
+        self._builder = builder
+
+    async def _generate_file(self, doc_id: str, structure: dict, fallback_title: str) -> str:
+        """Build and save the document in a worker thread so the event loop keeps serving requests."""
+        async with _build_slots:
+            return await asyncio.to_thread(self._builder, doc_id, structure, fallback_title)
 
     async def run(
         self, 
         prompt: str, 
-        title: str = "Generated Document", 
+        title: Optional[str] = None, 
         style_guide: Optional[Dict[str, Any]] = None,
         api_config: Optional[Dict[str, Any]] = None
     ) -> ToolResult:
+        title = title or self.default_title
         try:
-            doc_id = str(uuid.uuid4())
+            doc_id = secrets.token_hex(16)
             
             # 1. Generate Structure using LLM
-            structure = await llm_service.generate_document_structure(
-                user_prompt=prompt,
-                doc_type='word',
-                style_guide=None, # Passed in prompt parsing or strictly enforced? 
-                                  # llm.py handles style guide parsing from prompt too.
-                                  # Let's keep it simple and just pass prompt.
-                config=api_config
-            )
+            structure = await _generate_structure(prompt, self.doc_type, api_config)
             
-            # If explicit style guide provided, override or merge?
-            # For now, let's assume the LLM structure might include style info parsed from prompt,
-            # but we can overlay explicit settings if we had them.
+            # Overlay explicit style settings (used by Word) on those the LLM produced
             if style_guide:
-                if 'style_guide' not in structure:
-                    structure['style_guide'] = {}
-                structure['style_guide'].update(style_guide)
+                # The structure may be shared through the cache; overlay onto a copy
+                structure = {**structure, 'style_guide': {**(structure.get('style_guide') or {}), **style_guide}}
 
             # 2. Generate File using Engine
             filepath = await self._generate_file(doc_id, structure, title)
+            file_name = os.path.basename(filepath)
             
             return ToolResult(
                 success=True,
                 data={
                     "file_path": filepath,
-                    "file_name": os.path.basename(filepath),
-                    "file_url": f"/api/download/{os.path.basename(filepath)}",
+                    "file_name": file_name,
+                    "file_url": f"/api/download/{file_name}",
                     "title": structure.get('title', title),
                     "structure": structure
                 },
-                message=f"Successfully generated Word document: {structure.get('title', title)}",
+                message=f"Successfully generated {self.label}: {structure.get('title', title)}",
                 artifacts=[filepath]
             )
             
         except Exception as e:
-            logger.error(f"Word generation failed: {e}", exc_info=True)
-            return ToolResult(success=False, error=str(e))
-
-    async def _generate_file(self, doc_id: str, structure: dict, fallback_title: str) -> str:
-        engine = WordEngine()
-        
-        # Apply style guide
-        style = structure.get('style_guide', {})
-        if style:
-            margin = style.get('margin', 2.54)
-            engine.set_page_margins(top=margin, bottom=margin, left=margin, right=margin)
-        else:
-            engine.set_page_margins(top=2.54, bottom=2.54, left=3.18, right=3.18)
-        
-        # Content
-        title = structure.get('title', fallback_title)
-        engine.add_heading(title, level=1)
-        
-        for section in structure.get('sections', []):
-            if section.get('heading'):
-                engine.add_heading(section['heading'], level=section.get('level', 2))
-            
-            engine.add_paragraph(
-                section.get('content', ''),
-                font_name=style.get('font_name', 'Arial'),
-                font_size=style.get('font_size', 12),
-                line_spacing=style.get('line_spacing', 1.5),
-                line_spacing_rule='multiple',
-                space_after=12
-            )
-        
-        filepath = os.path.join(OUTPUT_DIR, f"{doc_id}.docx")
-        engine.save(filepath)
-        return filepath
-
-class ExcelGenerationTool(BaseTool):
-    """Tool for generating Excel spreadsheets."""
-    name = "generate_excel_spreadsheet"
-    description = "Generates an Excel spreadsheet based on a user prompt."
-
-    async def run(
-        self, 
-        prompt: str, 
-        title: str = "Generated Sheet", 
-        api_config: Optional[Dict[str, Any]] = None
-    ) -> ToolResult:
-        try:
-            doc_id = str(uuid.uuid4())
-            
-            # 1. Generate Structure
-            structure = await llm_service.generate_document_structure(
-                user_prompt=prompt,
-                doc_type='excel',
-                config=api_config
-            )
-            
-            # 2. Generate File
-            filepath = await self._generate_file(doc_id, structure, title)
-            
-            return ToolResult(
-                success=True,
-                data={
-                    "file_path": filepath,
-                    "file_name": os.path.basename(filepath),
-                    "file_url": f"/api/download/{os.path.basename(filepath)}",
-                    "title": structure.get('title', title),
-                    "structure": structure
-                },
-                message=f"Successfully generated Excel file: {structure.get('title', title)}",
-                artifacts=[filepath]
-            )
-
-        except Exception as e:
-            logger.error(f"Excel generation failed: {e}", exc_info=True)
-            return ToolResult(success=False, error=str(e))
-
-    async def _generate_file(self, doc_id: str, structure: dict, fallback_title: str) -> str:
-        engine = ExcelEngine()
-        
-        title = structure.get('title', fallback_title)
-        engine.set_sheet_name(title[:31])
-        
-        headers = structure.get('headers', [])
-        if headers:
-            engine.set_row_data(1, headers, header=True)
-        
-        rows = structure.get('rows', [])
-        for i, row in enumerate(rows):
-            engine.set_row_data(i + 2, row)
-        
-        import re
-        formulas = structure.get('formulas', {})
-        for cell_ref, formula in formulas.items():
-            match = re.match(r'([A-Z]+)(\d+)', cell_ref.upper())
-            if match:
-                col = sum((ord(c) - ord('A') + 1) * (26 ** i) for i, c in enumerate(reversed(match.group(1))))
-                row = int(match.group(2))
-                engine.set_formula(row, col, formula)
-        
-        engine.auto_fit_columns()
-        if headers and rows:
-            engine.add_borders(1, 1, len(rows) + 1, len(headers))
-        
-        filepath = os.path.join(OUTPUT_DIR, f"{doc_id}.xlsx")
-        engine.save(filepath)
-        return filepath
-
-class PPTGenerationTool(BaseTool):
-    """Tool for generating PowerPoint presentations."""
-    name = "generate_presentation"
-    description = "Generates a PowerPoint presentation based on a user prompt."
-
-    async def run(
-        self, 
-        prompt: str, 
-        title: str = "Generated Presentation", 
-        api_config: Optional[Dict[str, Any]] = None
-    ) -> ToolResult:
-        try:
-            doc_id = str(uuid.uuid4())
-            
-            # 1. Generate Structure
-            structure = await llm_service.generate_document_structure(
-                user_prompt=prompt,
-                doc_type='ppt',
-                config=api_config
-            )
-            
-            # 2. Generate File
-            filepath = await self._generate_file(doc_id, structure, title)
-            
-            return ToolResult(
-                success=True,
-                data={
-                    "file_path": filepath,
-                    "file_name": os.path.basename(filepath),
-                    "file_url": f"/api/download/{os.path.basename(filepath)}",
-                    "title": structure.get('title', title),
-                    "structure": structure
-                },
-                message=f"Successfully generated Presentation: {structure.get('title', title)}",
-                artifacts=[filepath]
-            )
-
-        except Exception as e:
-            logger.error(f"PPT generation failed: {e}", exc_info=True)
+            logger.error(f"{self.doc_type} generation failed: {e}", exc_info=True)
             return ToolResult(success=False, error=str(e))
 
-    async def _generate_file(self, doc_id: str, structure: dict, fallback_title: str) -> str:
-        engine = PPTEngine()
-        
-        title = structure.get('title', fallback_title)
-        subtitle = structure.get('subtitle', 'Generated by AI Office Suite')
-        
-        engine.add_title_slide(title, subtitle)
-        
-        for slide_data in structure.get('slides', [])[1:]:
-            slide_title = slide_data.get('title', 'Slide')
-            content = slide_data.get('content', [])
-            
-            if slide_data.get('type') == 'title':
-                engine.add_title_slide(slide_title, content[0] if content else '')
-            else:
-                engine.add_content_slide(slide_title, content if isinstance(content, list) else [content])
-        
-        filepath = os.path.join(OUTPUT_DIR, f"{doc_id}.pptx")
-        engine.save(filepath)
-        return filepath
-
 # Instantiate registry or instances if needed
-word_tool = WordGenerationTool()
-excel_tool = ExcelGenerationTool()
-ppt_tool = PPTGenerationTool()
+word_tool = DocumentGenerationTool(
+    "generate_word_document",
+    "Generates a Word document based on a user prompt and optional style guide.",
+    'word', "Word document", "Generated Document", _build_word
+)
+excel_tool = DocumentGenerationTool(
+    "generate_excel_spreadsheet",
+    "Generates an Excel spreadsheet based on a user prompt.",
+    'excel', "Excel file", "Generated Sheet", _build_excel
+)
+ppt_tool = DocumentGenerationTool(
+    "generate_presentation",
+    "Generates a PowerPoint presentation based on a user prompt.",
+    'ppt', "Presentation", "Generated Presentation", _build_ppt
+)
@@ -3,20 +3,31 @@ from dotenv import load_dotenv
 load_dotenv(override=True)
 
 # Clean up conflicting proxy variants from shell environment
-for key in ["all_proxy", "http_proxy", "https_proxy", "ALL_PROXY", "HTTP_PROXY", "HTTPS_PROXY"]:
-    if key in os.environ:
-        del os.environ[key]
+for key in ("all_proxy", "http_proxy", "https_proxy", "ALL_PROXY", "HTTP_PROXY", "HTTPS_PROXY"):
+    os.environ.pop(key, None)
 
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
-app = FastAPI(title="AI Office Suite Engine")
 
-# Configure CORS
-import os
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    from core.llm import llm_service
+    await llm_service.aclose()
+
 
+app = FastAPI(title="AI Office Suite Engine", lifespan=lifespan)
+
+# Configure CORS
 # Get allowed origins from environment or use defaults
-ALLOWED_ORIGINS = os.getenv("ALLOWED_ORIGINS", "http://localhost:5173,http://127.0.0.1:5173").split(",")
+# Stripped so "a, b" works; a malformed origin would fail every preflight from that site
+ALLOWED_ORIGINS = tuple(
+    origin.strip()
+    for origin in os.getenv("ALLOWED_ORIGINS", "http://localhost:5173,http://127.0.0.1:5173").split(",")
+    if origin.strip()
+)
 
 app.add_middleware(
     CORSMiddleware,
@@ -24,6 +35,8 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["GET", "POST", "OPTIONS"],
     allow_headers=["Content-Type", "Authorization"],
+    expose_headers=["Content-Disposition"],  # Lets the client read download file names
+    max_age=86400,  # Browsers may reuse a preflight result for a day
 )
 
 from api.routes import router as api_router
@@ -0,0 +1,56 @@
+import os
+
+import pytest
+
+from core import tools
+from core.llm import llm_service
+
+# Structures the mocked LLM returns, so tests exercise file generation without network calls
+FIXED_STRUCTURES = {
+    "word": {
+        "title": "Project Alpha Agenda",
+        "sections": [
+            {"heading": f"Item {i}", "level": 2, "content": "Discussion of goals, owners and deadlines. " * 8}
+            for i in range(1, 21)
+        ],
+    },
+    "excel": {
+        "title": "Q1 Budget",
+        "headers": ["Item", "Category", "Amount"],
+        "rows": [[f"Item {i}", "Operations", i * 100] for i in range(1, 201)],
+        "formulas": {"C202": "=SUM(C2:C201)"},
+    },
+    "ppt": {
+        "title": "AI Agents Overview",
+        "subtitle": "Generated by AI Office Suite",
+        "slides": [{"type": "title"}] + [
+            {"type": "content", "title": f"Slide {i}", "content": ["Point one", "Point two", "Point three"]}
+            for i in range(1, 16)
+        ],
+    },
+}
+
+
+@pytest.fixture
+def fixed_structures():
+    return FIXED_STRUCTURES
+
+
+@pytest.fixture
+def mock_llm(monkeypatch):
+    """Replace structure generation with FIXED_STRUCTURES; returns the list of (prompt, doc_type) calls."""
+    calls = []
+
+    async def generate_document_structure(user_prompt, doc_type, style_guide=None, config=None, context=None):
+        calls.append((user_prompt, doc_type))
+        return FIXED_STRUCTURES[doc_type]
+
+    monkeypatch.setattr(llm_service, "generate_document_structure", generate_document_structure)
+    return calls
+
+
+@pytest.fixture
+def output_dir(tmp_path, monkeypatch):
+    """Write generated files to a temporary directory instead of server/output."""
+    monkeypatch.setattr(tools, "_OUTPUT_PREFIX", str(tmp_path) + os.sep)
+    return tmp_path
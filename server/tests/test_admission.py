@@ -0,0 +1,76 @@
+import asyncio
+
+import pytest
+
+from core.admission import Admission
+
+
+@pytest.mark.asyncio
+async def test_admission_bounds_concurrency():
+    admission = Admission(2)
+    active = peak = 0
+
+    async def call():
+        nonlocal active, peak
+        async with admission:
+            active += 1
+            peak = max(peak, active)
+            await asyncio.sleep(0.01)
+            active -= 1
+
+    await asyncio.gather(*(call() for _ in range(6)))
+
+    assert peak == 2
+    assert admission.active == 0
+
+
+@pytest.mark.asyncio
+async def test_admission_resize_wakes_waiters():
+    admission = Admission(1)
+    await admission.acquire()
+
+    waiter = asyncio.create_task(admission.acquire())
+    await asyncio.sleep(0.01)
+    assert not waiter.done()
+
+    await admission.resize(2)
+    await asyncio.wait_for(waiter, timeout=1)
+    assert admission.active == 2
+
+    await admission.release()
+    await admission.release()
+    assert admission.active == 0
+
+
+@pytest.mark.asyncio
+async def test_admission_releases_on_error():
+    admission = Admission(1)
+
+    with pytest.raises(RuntimeError):
+        async with admission:
+            raise RuntimeError("boom")
+
+    assert admission.active == 0
+
+
+@pytest.mark.asyncio
+async def test_admission_cancelled_waiter_passes_on_wakeup():
+    admission = Admission(1)
+    await admission.acquire()
+
+    first = asyncio.create_task(admission.acquire())
+    second = asyncio.create_task(admission.acquire())
+    await asyncio.sleep(0.01)
+
+    # Release, but cancel the notified first waiter before it gets to run
+    admission.active -= 1
+    async with admission.cond:
+        admission.cond.notify(1)
+        first.cancel()
+
+    await asyncio.wait_for(second, timeout=1)
+    assert first.cancelled()
+    assert admission.active == 1
+
+    await admission.release()
+    assert admission.active == 0
@@ -0,0 +1,110 @@
+import asyncio
+
+import pytest
+
+from core.batching import DetectBatcher
+from core.llm import llm_service
+
+
+@pytest.fixture
+def detect_calls(monkeypatch):
+    """Mock the LLM detectors: a prompt containing 'sheet' is excel, anything else word."""
+    calls = {"batch": [], "single": []}
+
+    def classify(prompt):
+        return "excel" if "sheet" in prompt else "word"
+
+    async def detect_document_types(user_prompts, config=None):
+        calls["batch"].append((list(user_prompts), config))
+        return [classify(prompt) for prompt in user_prompts]
+
+    async def detect_document_type(user_prompt, config=None):
+        calls["single"].append((user_prompt, config))
+        return classify(user_prompt)
+
+    monkeypatch.setattr(llm_service, "detect_document_types", detect_document_types)
+    monkeypatch.setattr(llm_service, "detect_document_type", detect_document_type)
+    return calls
+
+
+@pytest.mark.asyncio
+async def test_concurrent_detections_share_one_call(detect_calls):
+    batcher = DetectBatcher(window=0.01, max_batch=16)
+
+    results = await asyncio.gather(
+        batcher.detect("a report"), batcher.detect("a sheet"), batcher.detect("a memo")
+    )
+
+    assert results == ["word", "excel", "word"]
+    assert detect_calls["batch"] == [(["a report", "a sheet", "a memo"], None)]
+    assert detect_calls["single"] == []
+
+
+@pytest.mark.asyncio
+async def test_single_detection_uses_single_call(detect_calls):
+    batcher = DetectBatcher(window=0.01, max_batch=16)
+
+    assert await batcher.detect("a sheet") == "excel"
+    assert detect_calls["batch"] == []
+    assert detect_calls["single"] == [("a sheet", None)]
+
+
+@pytest.mark.asyncio
+async def test_full_batch_flushes_before_window(detect_calls):
+    batcher = DetectBatcher(window=10, max_batch=2)
+
+    results = await asyncio.wait_for(
+        asyncio.gather(batcher.detect("one"), batcher.detect("two sheet")), timeout=1
+    )
+
+    assert results == ["word", "excel"]
+    assert len(detect_calls["batch"]) == 1
+
+
+@pytest.mark.asyncio
+async def test_different_configs_are_not_batched_together(detect_calls):
+    batcher = DetectBatcher(window=0.01, max_batch=16)
+
+    await asyncio.gather(
+        batcher.detect("a", {"model": "m1"}), batcher.detect("b", {"model": "m2"})
+    )
+
+    assert sorted(detect_calls["single"]) == [("a", {"model": "m1"}), ("b", {"model": "m2"})]
+
+
+@pytest.mark.asyncio
+async def test_malformed_batch_falls_back_to_single_calls(detect_calls, monkeypatch):
+    async def mismatched(user_prompts, config=None):
+        raise ValueError("expected 2 types, got 1")
+
+    monkeypatch.setattr(llm_service, "detect_document_types", mismatched)
+    batcher = DetectBatcher(window=0.01, max_batch=16)
+
+    results = await asyncio.gather(batcher.detect("x"), batcher.detect("y sheet"))
+
+    assert results == ["word", "excel"]
+    assert sorted(prompt for prompt, _ in detect_calls["single"]) == ["x", "y sheet"]
+
+
+@pytest.mark.asyncio
+async def test_errors_reach_every_waiter(detect_calls, monkeypatch):
+    async def down(user_prompts, config=None):
+        raise RuntimeError("provider down")
+
+    monkeypatch.setattr(llm_service, "detect_document_types", down)
+    batcher = DetectBatcher(window=0.01, max_batch=16)
+
+    results = await asyncio.gather(batcher.detect("x"), batcher.detect("y"), return_exceptions=True)
+
+    assert [str(r) for r in results] == ["provider down", "provider down"]
+
+
+@pytest.mark.asyncio
+async def test_zero_window_sends_each_prompt_alone(detect_calls):
+    batcher = DetectBatcher(window=0, max_batch=16)
+
+    results = await asyncio.gather(batcher.detect("a report"), batcher.detect("a sheet"))
+
+    assert results == ["word", "excel"]
+    assert detect_calls["batch"] == []
+    assert sorted(prompt for prompt, _ in detect_calls["single"]) == ["a report", "a sheet"]
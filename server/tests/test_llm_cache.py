@@ -0,0 +1,90 @@
+import asyncio
+
+import pytest
+
+from core.llm_cache import LLMCache, MemoryBackend, make_key
+
+
+def test_make_key_ignores_api_key_and_part_order():
+    a = make_key("structure", {"api_key": "sk-1", "model": "m"}, doc_type="word", prompt="p")
+    b = make_key("structure", {"api_key": "sk-2", "model": "m"}, prompt="p", doc_type="word")
+
+    assert a == b
+    assert a.startswith("structure:")
+    assert "sk-" not in a
+
+
+def test_make_key_distinguishes_model_and_parts():
+    base = make_key("structure", {"model": "m"}, doc_type="word", prompt="p")
+
+    assert base != make_key("structure", {"model": "other"}, doc_type="word", prompt="p")
+    assert base != make_key("structure", {"model": "m"}, doc_type="excel", prompt="p")
+    assert base != make_key("detect", {"model": "m"}, doc_type="word", prompt="p")
+
+
+def _cache(ttl: int = 60) -> LLMCache:
+    return LLMCache(MemoryBackend(maxsize=16, ttl=ttl), ttl=ttl)
+
+
+@pytest.mark.asyncio
+async def test_get_or_compute_caches_result():
+    cache = _cache()
+    calls = 0
+
+    async def compute():
+        nonlocal calls
+        calls += 1
+        return {"title": "T"}
+
+    assert await cache.get_or_compute("k", compute) == {"title": "T"}
+    assert await cache.get_or_compute("k", compute) == {"title": "T"}
+    assert calls == 1
+
+
+@pytest.mark.asyncio
+async def test_concurrent_requests_share_one_computation():
+    cache = _cache()
+    calls = 0
+
+    async def compute():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return calls
+
+    results = await asyncio.gather(*(cache.get_or_compute("k", compute) for _ in range(5)))
+
+    assert results == [1] * 5
+    assert calls == 1
+
+
+@pytest.mark.asyncio
+async def test_failures_are_not_cached():
+    cache = _cache()
+    attempts = 0
+
+    async def compute():
+        nonlocal attempts
+        attempts += 1
+        if attempts == 1:
+            raise RuntimeError("transient")
+        return "ok"
+
+    with pytest.raises(RuntimeError):
+        await cache.get_or_compute("k", compute)
+    assert await cache.get_or_compute("k", compute) == "ok"
+    assert attempts == 2
+
+
+@pytest.mark.asyncio
+async def test_zero_ttl_disables_cache():
+    cache = _cache(ttl=0)
+    calls = 0
+
+    async def compute():
+        nonlocal calls
+        calls += 1
+        return calls
+
+    assert await cache.get_or_compute("k", compute) == 1
+    assert await cache.get_or_compute("k", compute) == 2
@@ -0,0 +1,54 @@
+from core.structure_stream import StructureStreamParser
+
+STREAM = (
+    "Here is the outline:\n- Overview\n- Budget\n"
+    "<STRUCTURE>\n```json\n"
+    '{"title": "Plan", "sections": [{"heading": "Overview", "level": 2}, '
+    '{"heading": "Budget", "content": "Costs"}], "rows": [[1, 2.5], [3, null]]}'
+    "\n```\n</STRUCTURE>"
+)
+
+
+def _feed(parser, text, size):
+    results = []
+    for i in range(0, len(text), size):
+        results.extend(parser.feed(text[i:i + size]))
+    return results
+
+
+EXPECTED = [
+    ("title", "Plan"),
+    ("sections.0.heading", "Overview"),
+    ("sections.0.level", 2),
+    ("sections.1.heading", "Budget"),
+    ("sections.1.content", "Costs"),
+    ("rows.0.0", 1),
+    ("rows.0.1", 2.5),
+    ("rows.1.0", 3),
+    ("rows.1.1", None),
+]
+
+
+def test_parses_whole_stream():
+    assert _feed(StructureStreamParser(), STREAM, len(STREAM)) == EXPECTED
+
+
+def test_parses_small_chunks_with_split_tag():
+    # 3-character chunks split the opening tag, keys and values across feeds
+    assert _feed(StructureStreamParser(), STREAM, 3) == EXPECTED
+
+
+def test_ignores_text_without_tag():
+    parser = StructureStreamParser()
+
+    assert parser.feed('Some markdown with {"json": "like"} text') == []
+    assert parser.feed("more text") == []
+
+
+def test_stops_after_malformed_json():
+    parser = StructureStreamParser()
+
+    results = parser.feed('<STRUCTURE>{"title": "A", "sections": ]')
+
+    assert results == [("title", "A")]
+    assert parser.feed('{"title": "B"}') == []
@@ -0,0 +1,69 @@
+import asyncio
+import os
+
+import pytest
+
+from core.tools import word_tool, excel_tool, ppt_tool
+
+TOOLS = [word_tool, excel_tool, ppt_tool]
+
+# Mean wall time (ms) a tool run may take with the LLM mocked out; fails the test on regressions
+PERF_BUDGET_MS = float(os.getenv("PERF_BUDGET_MS", "2000"))
+
+
+@pytest.mark.parametrize("tool", TOOLS, ids=lambda tool: tool.doc_type)
+def test_tool_run_perf(benchmark, tool, mock_llm, output_dir):
+    loop = asyncio.new_event_loop()
+    try:
+        result = benchmark.pedantic(
+            lambda: loop.run_until_complete(tool.run(prompt=f"Benchmark {tool.doc_type}", title="Benchmark")),
+            rounds=5,
+            warmup_rounds=1
+        )
+    finally:
+        loop.close()
+
+    assert result.success, result.error
+    assert os.path.exists(result.data["file_path"])
+    if benchmark.stats is not None:  # None under --benchmark-disable
+        assert benchmark.stats.stats.mean * 1000 < PERF_BUDGET_MS
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("tool", TOOLS, ids=lambda tool: tool.doc_type)
+async def test_tool_run_builds_file_from_structure(tool, fixed_structures, mock_llm, output_dir):
+    result = await tool.run(prompt=f"Build a {tool.doc_type} file", title="Fallback")
+
+    assert result.success, result.error
+    structure = fixed_structures[tool.doc_type]
+    assert result.data["structure"] == structure
+    assert result.data["title"] == structure["title"]
+    assert result.data["file_url"] == f"/api/download/{result.data['file_name']}"
+    assert result.artifacts == [result.data["file_path"]]
+    assert os.path.dirname(result.data["file_path"]) == str(output_dir)
+    assert os.path.getsize(result.data["file_path"]) > 0
+
+
+@pytest.mark.asyncio
+async def test_word_style_guide_overlays_a_copy(fixed_structures, mock_llm, output_dir):
+    result = await word_tool.run(prompt="Styled agenda", style_guide={"font_size": 14})
+
+    assert result.success, result.error
+    assert result.data["structure"]["style_guide"] == {"font_size": 14}
+    # The (possibly cached) structure from the LLM is left untouched
+    assert "style_guide" not in fixed_structures["word"]
+
+
+@pytest.mark.asyncio
+async def test_tool_run_reports_llm_failure(monkeypatch, output_dir):
+    from core.llm import llm_service
+
+    async def fail(*args, **kwargs):
+        raise RuntimeError("upstream unavailable")
+
+    monkeypatch.setattr(llm_service, "generate_document_structure", fail)
+    result = await excel_tool.run(prompt="A failing request")
+
+    assert not result.success
+    assert result.error == "upstream unavailable"
+    assert not any(output_dir.iterdir())